@@ -0,0 +1,95 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from lesion_detector import detect_lesions, UnreadableImage, ImageTooLarge
+
+# Lesion detection is CPU-bound numpy/PIL work, so it runs in processes, not threads
+POOL_WORKERS = int(os.environ.get('DISEASE_POOL_WORKERS', os.cpu_count() or 1))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _start_method():
+    # Forking a threaded Flask/gunicorn worker is unsafe; Windows only has spawn
+    return 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def get_pool():
+    """Shared, bounded process pool (created on first batch)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, POOL_WORKERS),
+                mp_context=multiprocessing.get_context(_start_method())
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def detect_in_pool(detector, image_bytes):
+    """Run one detector call on the shared pool, so request threads don't hold the GIL."""
+    if POOL_WORKERS <= 1:
+        return detector(image_bytes)
+    try:
+        return get_pool().submit(detector, image_bytes).result()
+    except (BrokenProcessPool, OSError) as e:
+        print(f"Analysis Pool Error: {e}")
+        _reset_pool()
+        return detector(image_bytes)
+
+
+def _as_bytes(image):
+    return image.read() if hasattr(image, 'read') else image
+
+
+def detect_or_error(image):
+    """detect_lesions, but a photo that can't be analyzed comes back as its
+    UnreadableImage/ImageTooLarge instead of raising, so one bad photo
+    doesn't sink the rest of a batch."""
+    try:
+        return detect_lesions(image)
+    except (UnreadableImage, ImageTooLarge) as e:
+        return e
+
+
+def detect_many(images):
+    """detect_or_error over many images, spread across every core. Order is preserved.
+
+    `images` are bytes or uploads with read(). Uploads are read only when
+    their turn comes, so at most two per worker are held in memory at once.
+    """
+    if not images:
+        return []
+    if len(images) == 1 or POOL_WORKERS <= 1:
+        return [detect_or_error(img) for img in images]
+
+    results = [None] * len(images)
+    window = 2 * max(1, POOL_WORKERS)
+    try:
+        pool = get_pool()
+        in_flight = {}
+        for i, img in enumerate(images):
+            if len(in_flight) >= window:
+                done = next(iter(in_flight))
+                results[done] = in_flight.pop(done).result()
+            in_flight[i] = pool.submit(detect_or_error, _as_bytes(img))
+        for i, future in in_flight.items():
+            results[i] = future.result()
+        return results
+    except (BrokenProcessPool, OSError) as e:
+        # A worker died (OOM kill, etc.): start fresh next time, finish this batch inline
+        print(f"Analysis Pool Error: {e}")
+        _reset_pool()
+        return [r if r is not None else detect_or_error(img) for r, img in zip(results, images)]
@@ -1,15 +1,24 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, url_for
 from flask_cors import CORS, cross_origin
 import json
 import os
 import random
-import numpy as np
-from PIL import Image
-import io
 import base64
+from lesion_detector import detect_lesions, detect_lesions_tiled, ImageTooLarge, UnreadableImage
+from disease_report import render_disease_report, build_farm_summary
+from analysis_pool import detect_many, detect_in_pool
+from disease_jobs import JobQueue, QueueFull
+from response_cache import ResponseCache, make_key
+from werkzeug.exceptions import RequestEntityTooLarge
+from upload_stream import ingest_upload, MAX_IMAGE_BYTES, MAX_AUDIO_BYTES
 
 app = Flask(__name__)
 
+# With spawn/forkserver, analysis_pool workers re-run the main script as
+# __mp_main__ (python app.py) just to unpickle detector functions. They skip
+# building the services below (voice copilot, job queue, recommenders).
+POOL_WORKER = __name__ == '__mp_main__'
+
 # Enable CORS for all routes and origins
 CORS(app, resources={
     r"/*": {
@@ -42,59 +51,29 @@ def add_cors_headers(response):
     response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
     return response
 
-# Helper function to detect diseased spots (simulation of CNN detection)
-def detect_lesions(image_bytes):
-    try:
-        img = Image.open(io.BytesIO(image_bytes)).convert('RGB')
-        img_np = np.array(img)
-        h, w, _ = img_np.shape
-        
-        # Simple color-based lesion detection (looking for brown/yellow/dark spots)
-        # Healthy green is roughly G > R and G > B
-        # Lesions are often R > 100, G < 200, B < 150 (brownish/yellowish)
-        
-        boxes = []
-        # Downsample for speed
-        step = max(h, w) // 50 
-        detected_points = []
-        
-        for y in range(0, h, step):
-            for x in range(0, w, step):
-                r, g, b = img_np[y, x]
-                # Brownish/Yellowish spot detection logic
-                if (r > 80 and g > 60 and r > g - 20 and b < 150):
-                    # Check if it's NOT a bright green leaf
-                    if not (g > r + 30 and g > b + 30):
-                        detected_points.append((x, y))
-
-        if not detected_points:
-            # Fallback for very green leaves (detect small dark spots)
-            for y in range(0, h, step):
-                for x in range(0, w, step):
-                    r, g, b = img_np[y, x]
-                    if r < 100 and g < 100 and b < 100 and abs(int(r)-int(g)) < 20: # dark spots
-                        detected_points.append((x, y))
-
-        # Simple clustering (group points into max 6 boxes)
-        if detected_points:
-            # Sort points to pick spread out ones
-            random.shuffle(detected_points)
-            for i in range(min(len(detected_points), 8)):
-                px, py = detected_points[i]
-                # Create a small box around the point
-                bw, bh = random.randint(5, 12), random.randint(5, 12)
-                boxes.append({
-                    "top": max(0, int((py/h)*100) - bh//2),
-                    "left": max(0, int((px/w)*100) - bw//2),
-                    "width": bw,
-                    "height": bh,
-                    "color": random.choice(["#EF4444", "#EAB308", "#F97316"]) # Red, Yellow, Orange
-                })
-        
-        return boxes if boxes else []
-    except Exception as e:
-        print(f"Detection Error: {e}")
-        return []
+# Whole-request cap, checked by Werkzeug against Content-Length before the body is read
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_REQUEST_BYTES', 100 * 1024 * 1024))
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"success": False, "error": e.description}), 413
+
+
+# Cache of serialized /analyze-disease responses (re-uploads and frontend retries)
+# Set DISEASE_CACHE_PATH to also keep entries on disk across worker restarts
+disease_cache = ResponseCache(
+    max_bytes=int(os.environ.get('DISEASE_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+    ttl=int(os.environ.get('DISEASE_CACHE_TTL', 6 * 3600)),
+    disk_path=os.environ.get('DISEASE_CACHE_PATH') or None
+)
+
+# Max leaf photos accepted by /analyze-disease/batch in one request
+BATCH_MAX_IMAGES = int(os.environ.get('DISEASE_BATCH_MAX_IMAGES', 50))
+
+def disease_response(body, cache_status):
+    response = app.response_class(body, mimetype='application/json')
+    response.headers['X-Cache'] = cache_status
+    return response
 
 # Mock data for recommendations
 CROP_DATA = [
@@ -154,6 +133,43 @@ def recommend():
         print(f"Recommend Error: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+def read_disease_form():
+    """Upload, form inputs and cache key of an /analyze-disease style request."""
+    soil_type = request.form.get('soil_type', 'Black')
+    weather_input = request.form.get('weather', 'Sunny')
+    upload = ingest_upload(request.files['image'], MAX_IMAGE_BYTES)
+    # mode=tiled: drone / high-resolution frames, scanned tile by tile. JPEG and
+    # uncompressed TIFF/BMP/PPM work at any size; other formats are refused
+    # (413) above TILED_MAX_PIXELS, since they have to be decoded whole
+    tiled = request.form.get('mode') == 'tiled'
+    cache_key = make_key(upload.digest, soil_type, weather_input, *(['tiled'] if tiled else []))
+    return upload, soil_type, weather_input, tiled, cache_key
+
+def run_disease_job(job):
+    """Async job body: detection on the process pool, then the usual report.
+
+    A photo that fails to decode raises, so the job is marked failed and
+    nothing is cached.
+    """
+    detector = detect_lesions_tiled if job['tiled'] else detect_lesions
+    boxes, stats = detect_in_pool(detector, job['image'])
+    body = render_disease_report(boxes, stats, job['soil_type'], job['weather'])
+    disease_cache.put(job['cache_key'], body)
+    return body
+
+# Opt-in async mode: submit to /analyze-disease/jobs, then poll or get a callback.
+# Set DISEASE_JOBS_DB to a file so every gunicorn worker can answer polls.
+disease_jobs = None if POOL_WORKER else JobQueue(
+    run_disease_job,
+    workers=int(os.environ.get('DISEASE_JOB_WORKERS', 2)),
+    max_pending=int(os.environ.get('DISEASE_JOB_MAX_PENDING', 32)),
+    db_path=os.environ.get('DISEASE_JOBS_DB') or ':memory:',
+    ttl=int(os.environ.get('DISEASE_JOB_TTL', 3600)),
+    callback_hosts=os.environ.get('DISEASE_JOB_CALLBACK_HOSTS', '').split(','),
+    # A photo that can't be read is the client's fault: poll it as 4xx, not 500
+    error_statuses={UnreadableImage: 400, ImageTooLarge: 413}
+)
+
 @app.route('/analyze-disease', methods=['POST', 'OPTIONS'])
 @cross_origin()
 def analyze_disease():
@@ -168,169 +184,194 @@ def analyze_disease():
                 {"top": 35, "left": 45, "width": 10, "height": 12, "color": "#EF4444"},
                 {"top": 50, "left": 55, "width": 12, "height": 14, "color": "#EF4444"}
             ]
-        else:
-            file = request.files['image']
-            img_bytes = file.read()
-            boxes = detect_lesions(img_bytes)
+            stats = {"lesion_fraction": 0.12, "cluster_count": 2, "mean_intensity": 120.0}
+            body = render_disease_report(
+                boxes, stats, request.form.get('soil_type', 'Black'), request.form.get('weather', 'Sunny')
+            )
+            return app.response_class(body, mimetype='application/json')
+
+        upload, soil_type, weather_input, tiled, cache_key = read_disease_form()
+
+        # Same photo + same form inputs: answer without decoding the image
+        body = disease_cache.get(cache_key)
+        if body is not None:
+            return disease_response(body, 'HIT')
+
+        boxes, stats = detect_lesions_tiled(upload.open()) if tiled else detect_lesions(upload.open())
+        body = render_disease_report(boxes, stats, soil_type, weather_input)
+        disease_cache.put(cache_key, body)
+        return disease_response(body, 'MISS')
+    except RequestEntityTooLarge as e:
+        return jsonify({"success": False, "error": e.description}), 413
+    except ImageTooLarge as e:
+        return jsonify({"success": False, "error": str(e)}), 413
+    except UnreadableImage as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        print(f"Disease Analysis Error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/analyze-disease/batch', methods=['POST', 'OPTIONS'])
+@cross_origin()
+def analyze_disease_batch():
+    try:
+        if request.method == 'OPTIONS':
+            return jsonify({'status': 'ok'}), 200
 
-        # Basic logic: if many boxes, severity is high
-        severity = "Moderate"
-        if len(boxes) > 5: severity = "High"
-        elif len(boxes) < 2: severity = "Low"
+        files = request.files.getlist('image')
+        if not files:
+            return jsonify({"success": False, "error": "No images provided"}), 400
+        if len(files) > BATCH_MAX_IMAGES:
+            return jsonify({
+                "success": False,
+                "error": f"Too many images ({len(files)}). Maximum is {BATCH_MAX_IMAGES} per request."
+            }), 413
 
         soil_type = request.form.get('soil_type', 'Black')
         weather_input = request.form.get('weather', 'Sunny')
 
-        # --- MULTI-MODAL LOGIC SIMULATION ---
-        # 1. Advisory generation (Simulating LLM)
-        advisory_text = "Based on the visual evidence of lesions"
-        if "Blight" in (("Bacterial Leaf Blight" if len(boxes) > 0 else "Healthy Leaf")):
-            advisory_text += ", the crop is suffering from Bacterial Blight."
-            if "Black" in soil_type:
-                advisory_text += " Since you have Black soil which retains moisture, avoid over-watering immediately to prevent bacterial spread."
-            elif "Red" in soil_type:
-                advisory_text += " For Red soil, ensure drainage is adequate."
-            
-            if "Rain" in weather_input or "Cloudy" in weather_input:
-                advisory_text += " With humid/rainy weather detected, the bacteria can spread rapidly. Application of bactericides is critical TODAY."
+        filenames = [f.filename or f"image_{i + 1}" for i, f in enumerate(files)]
+        reports = [None] * len(files)
+
+        # Duplicate photos in one visit are analyzed once
+        pending = {}
+        for i, f in enumerate(files):
+            upload = ingest_upload(f, MAX_IMAGE_BYTES)
+            key = make_key(upload.digest, soil_type, weather_input)
+            body = disease_cache.get(key) if key not in pending else None
+            if body is not None:
+                reports[i] = json.loads(body)
             else:
-                advisory_text += " Since weather is clear, you have a 24-hour window to apply treatment before it worsens."
-        else:
-             advisory_text = "Your crop looks healthy! Continue monitoring weekly."
+                pending.setdefault(key, (upload, []))[1].append(i)
 
-        # 2. RL/ML Simulation for Action Plan
-        # Heuristic: High Severity + Humid Weather = Immediate Action
-        urgency_score = len(boxes) * 10 
-        if "Rain" in weather_input: urgency_score += 20
-        
-        harvest_prediction = "15-20 days"
-        irrigation_advice = "Normal schedule"
-        if urgency_score > 50:
-            irrigation_advice = "STOP Irrigation for 48h"
-            harvest_prediction = "Delayed by 5-7 days due to stress"
+        # A photo that can't be analyzed gets an error entry and is never cached;
+        # the rest of the visit is still analyzed
+        errors = {}
+        keys = list(pending)
+        for key, result in zip(keys, detect_many([pending[k][0] for k in keys])):
+            if isinstance(result, (UnreadableImage, ImageTooLarge)):
+                for i in pending[key][1]:
+                    errors[i] = str(result)
+                continue
+            boxes, stats = result
+            body = render_disease_report(boxes, stats, soil_type, weather_input)
+            disease_cache.put(key, body)
+            report = json.loads(body)
+            for i in pending[key][1]:
+                reports[i] = report
 
-        data = {
+        if len(errors) == len(files):
+            return jsonify({
+                "success": False,
+                "error": "None of the images could be analyzed",
+                "results": [{"index": i, "filename": filenames[i], "error": errors[i]} for i in range(len(files))]
+            }), 400
+
+        return jsonify(build_farm_summary(reports, filenames, soil_type, weather_input, errors))
+    except RequestEntityTooLarge as e:
+        return jsonify({"success": False, "error": e.description}), 413
+    except Exception as e:
+        print(f"Batch Disease Analysis Error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@app.route('/analyze-disease/jobs', methods=['POST', 'OPTIONS'])
+@cross_origin()
+def submit_disease_job():
+    try:
+        if request.method == 'OPTIONS':
+            return jsonify({'status': 'ok'}), 200
+
+        if 'image' not in request.files:
+            return jsonify({"success": False, "error": "No image provided"}), 400
+
+        callback_url = request.form.get('callback_url') or None
+        if callback_url:
+            try:
+                disease_jobs.check_callback(callback_url)
+            except ValueError as e:
+                return jsonify({"success": False, "error": str(e)}), 400
+
+        upload, soil_type, weather_input, tiled, cache_key = read_disease_form()
+
+        body = disease_cache.get(cache_key)
+        if body is not None:
+            job_id = disease_jobs.add_done(body, callback_url)
+            status = 'done'
+        else:
+            job_id = disease_jobs.submit({
+                "image": upload.read(),
+                "soil_type": soil_type,
+                "weather": weather_input,
+                "tiled": tiled,
+                "cache_key": cache_key
+            }, callback_url)
+            status = 'queued'
+
+        return jsonify({
             "success": True,
-            "disease": "Bacterial Leaf Blight" if len(boxes) > 0 else "Healthy Leaf",
-            "confidence": f"{random.randint(88, 97)}%",
-            "severity": severity,
-            "reason": f"Combined Factors: {weather_input} Weather + Pathogen Presence",
-            "cause": "Caused by Xanthomonas bacteria." if len(boxes) > 0 else "Overall healthy.",
-            "symptoms": [
-                "Water-soaked stripes",
-                "Yellow lesions"
-            ] if len(boxes) > 0 else ["No symptoms"],
-            "boxes": boxes,
-            
-            # --- NEW MULTI-MODAL FIELDS ---
-            "smart_advisory": advisory_text,
-            "action_plan": {
-                "irrigation": irrigation_advice,
-                "harvest_impact": harvest_prediction,
-                "fertilizer": "Avoid Nitrogen (Urea) now" if len(boxes) > 0 else "Apply NPK 10:26:26"
-            },
-            
-            "damage_assessment": {
-                "affected_area": f"{random.randint(25, 35)}%",
-                "spread_rate": "High" if urgency_score > 40 else "Moderate",
-                "potential_loss": "15-25%",
-                "urgency": "CRITICAL: Act within 24h" if urgency_score > 50 else "Monitor closely"
-            },
-            "economics": {
-                "treatment_cost": "₹700",
-                "potential_loss_value": "₹12,500",
-                "roi": "18x Return",
-                "recommendation": "Treat to save yield"
-            },
-            "weather_timing": {
-                "best_time": "Late Afternoon (post 4 PM)" if "Sunny" in weather_input else "Wait for dry spell",
-                "reason": f"Based on {weather_input} forecast to maximize absorption.",
-                "forecast": f"{weather_input} currently."
-            },
-            "community": {
-                "nearby_cases": random.randint(5, 15),
-                "success_rate": "82%",
-                "top_tip": "Add garlic paste to neem spray for better adhesion (Ramesh Patil, Expert Farmer)"
-            },
-            "recovery_tracking": {
-                "timeline": [
-                    {"day": 0, "status": "30% affected", "icon": "🔴"},
-                    {"day": 3, "status": "Upload to track progress", "icon": "📸"},
-                    {"day": 7, "status": "Expected 10% affected", "icon": "📉"},
-                    {"day": 10, "status": "Full Recovery Expected", "icon": "✅"}
-                ]
-            },
-            "prevention": {
-                "factors": ["High Humidity (>80%)", "Dense Planting", "Overhead Irrigation"],
-                "next_season": [
-                    "Plant resistant varieties (IR-24 or similar)",
-                    "Increase row spacing to 20cm",
-                    "Spray preventive copper at flowering stage",
-                    "Remove infected plant debris immediately"
-                ]
-            },
-            "additional_issues": [
-                {"name": "Aphid Infestation", "confidence": "72%", "severity": "Minor"}
-            ] if random.random() > 0.5 else [],
-            
-            # --- END ENHANCED FIELDS ---
-
-            "treatments": {
-                "organic": {
-                    "name": "Neem Oil & Balanced Nutrition",
-                    "price": "₹200/liter",
-                    "usage": "Spray Neem oil (5ml/L).",
-                    "effectiveness": "85%",
-                    "benefits": ["Safe for bees", "Zero harvest waiting", "Improves soil"],
-                    "steps": [
-                        "Mix 5ml Neem oil with 1 liter of fresh water.",
-                        "Add 2-3 drops of liquid soap to help mixing.",
-                        "Spray thoroughly on both sides of the leaves.",
-                        "Repeat every 7 days during early morning or late evening."
-                    ]
-                },
-                "chemical": {
-                    "name": "Copper Oxychloride + Streptocycline",
-                    "price": "₹450/kg",
-                    "usage": "Mix 2.5g COC and 0.5g Streptocycline per liter.",
-                    "effectiveness": "95%",
-                    "benefits": ["Fast action", "Kills bacteria on contact", "Rainfastness"],
-                    "steps": [
-                        "Dissolve 0.5g Streptocycline in a small amount of water first.",
-                        "Add it to 1 liter water and mix 2.5g Copper Oxychloride.",
-                        "Apply as a foliar spray focusing on infected patches.",
-                        "Avoid spraying during high winds or rain."
-                    ]
-                }
-            },
-            "shops": [
-                {"name": "Shri Ganesh Agri Store", "dist": "2.3 km", "phone": "98220XXXXX", "location": "MIDC Central Market, Nashik"},
-                {"name": "Farmers Pride Shop", "dist": "4.1 km", "phone": "90110XXXXX", "location": "Shivaji Nagar Square, Opp. Railway Station"}
-            ]
-        }
-        return jsonify(data)
+            "job_id": job_id,
+            "status": status,
+            "status_url": f"/analyze-disease/jobs/{job_id}"
+        }), 202
+    except QueueFull:
+        response = jsonify({
+            "success": False,
+            "error": "Server is busy analyzing other photos. Please retry shortly."
+        })
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    except RequestEntityTooLarge as e:
+        return jsonify({"success": False, "error": e.description}), 413
     except Exception as e:
-        print(f"Disease Analysis Error: {e}")
+        print(f"Disease Job Submit Error: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/analyze-disease/jobs/<job_id>', methods=['GET'])
+def disease_job_status(job_id):
+    job = disease_jobs.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Unknown or expired job id"}), 404
+
+    status, result, error, error_status = job
+    if status == 'done':
+        # Splice the stored report in as-is instead of parsing it again
+        body = b'{"success":true,"job_id":"' + job_id.encode() + b'","status":"done","result":' + result + b'}'
+        return app.response_class(body, mimetype='application/json')
+    if status == 'failed':
+        return jsonify({"success": False, "job_id": job_id, "status": status, "error": error}), error_status or 500
+    return jsonify({"success": True, "job_id": job_id, "status": status})
+
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({"status": "OK", "service": "KrishiMitra Backend"})
+    return jsonify({
+        "status": "OK",
+        "service": "KrishiMitra Backend",
+        "disease_cache": disease_cache.stats(),
+        "disease_jobs": disease_jobs.stats(),
+        "llm_providers": voice_copilot.provider_health() if hasattr(voice_copilot, 'provider_health') else {},
+        "chat_cache": voice_copilot.cache_stats() if hasattr(voice_copilot, 'cache_stats') else {},
+        "fertilizer_cache": fertilizer_recommender.cache_stats() if 'fertilizer_recommender' in globals() else {}
+    })
 
 
 # Import the improved voice copilot
-try:
-    from voice_copilot_fixed import VoiceCopilot
-    voice_copilot = VoiceCopilot()
-    print("✅ VoiceCopilot loaded successfully")
-except ImportError:
-    print("⚠️ Using original voice_copilot.py")
+if not POOL_WORKER:
     try:
-        from voice_copilot import VoiceCopilot
+        from voice_copilot_fixed import VoiceCopilot
         voice_copilot = VoiceCopilot()
-    except Exception as e:
-        print(f"❌ Error loading voice_copilot: {e}")
-        voice_copilot = None
+        # SDK imports and TTS warm-up happen off the startup path
+        voice_copilot.warm_up()
+        print("✅ VoiceCopilot loaded successfully")
+    except ImportError:
+        print("⚠️ Using original voice_copilot.py")
+        try:
+            from voice_copilot import VoiceCopilot
+            voice_copilot = VoiceCopilot()
+        except Exception as e:
+            print(f"❌ Error loading voice_copilot: {e}")
+            voice_copilot = None
+else:
+    voice_copilot = None
 
 @app.route('/chat/send', methods=['POST', 'OPTIONS'])
 @cross_origin()
@@ -374,6 +415,67 @@ def chat_send():
         traceback.print_exc()
         return jsonify({"success": False, "error": str(e)}), 500
 
+def sse_event(data, event=None):
+    """One Server-Sent Events frame with a JSON payload."""
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.route('/chat/stream', methods=['POST', 'OPTIONS'])
+@cross_origin()
+def chat_stream():
+    """/chat/send as Server-Sent Events: a meta event, one "data" event per
+    piece of the answer as the provider generates it, then "done".
+
+    Each open stream holds a worker thread (or greenlet), so run gunicorn with
+    threaded or gevent workers, e.g. `gunicorn --threads 8 app:app`.
+    """
+    try:
+        if request.method == 'OPTIONS':
+            return jsonify({'status': 'ok'}), 200
+
+        data = request.json or {}
+        text = data.get('text', '')
+        language = data.get('language', 'auto')
+
+        if not text or text.strip() == '':
+            return jsonify({
+                "success": False,
+                "error": "Empty message"
+            }), 400
+
+        if not voice_copilot:
+            return jsonify({
+                "success": False,
+                "error": "Voice Copilot not initialized"
+            }), 500
+
+        if language == 'auto':
+            language = voice_copilot.detect_language(text)
+
+        def events():
+            yield sse_event({"language": language}, "meta")
+            try:
+                if hasattr(voice_copilot, 'stream_text_response'):
+                    pieces = voice_copilot.stream_text_response(text, language)
+                else:
+                    pieces = [voice_copilot.get_text_response(text, language)]
+                for piece in pieces:
+                    yield sse_event({"delta": piece})
+                yield sse_event({"success": True}, "done")
+            except Exception as e:
+                print(f"Chat Stream Error: {e}")
+                yield sse_event({"success": False, "error": str(e)}, "error")
+
+        return app.response_class(
+            events(),
+            mimetype='text/event-stream',
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    except Exception as e:
+        print(f"Chat Stream Error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/voice/chat', methods=['POST', 'OPTIONS'])
 @cross_origin()
 def voice_chat():
@@ -387,10 +489,9 @@ def voice_chat():
                 "error": "No audio file provided. Please record your voice."
             }), 400
             
-        file = request.files['audio']
-        audio_bytes = file.read()
+        upload = ingest_upload(request.files['audio'], MAX_AUDIO_BYTES)
         
-        if len(audio_bytes) < 100:  # Too small to be valid audio
+        if upload.size < 100:  # Too small to be valid audio
             return jsonify({
                 "success": False,
                 "error": "Audio file too small. Please record again."
@@ -404,9 +505,18 @@ def voice_chat():
         
         # Get language preference if provided
         language = request.form.get('language', 'auto')
+        # audio_mode=url: JSON carries only text and an audio_url to fetch raw MP3 from
+        audio_by_url = request.form.get('audio_mode') == 'url' and hasattr(voice_copilot, 'get_audio')
         
         # Process voice query
-        result = voice_copilot.process_voice_query(audio_bytes, language)
+        # The fixed copilot hands back base64 straight from its TTS cache
+        pre_encoded = getattr(voice_copilot, 'tts_returns_base64', False)
+        if audio_by_url:
+            result = voice_copilot.process_voice_query(upload.open(), language, audio_format='id')
+        elif pre_encoded:
+            result = voice_copilot.process_voice_query(upload.open(), language, audio_format='base64')
+        else:
+            result = voice_copilot.process_voice_query(upload.open(), language)
         
         if "error" in result:
             return jsonify({
@@ -415,10 +525,23 @@ def voice_chat():
                 "hint": "Please speak clearly and try again. Make sure your microphone is working."
             }), 500
 
+        if audio_by_url:
+            audio_id = result.get("ai_audio")
+            return jsonify({
+                "success": True,
+                "user_text": result["user_text"],
+                "ai_text": result["ai_text"],
+                "audio_id": audio_id,
+                "audio_url": url_for('voice_audio', audio_id=audio_id) if audio_id else None,
+                "audio_type": "audio/mpeg",
+                "language": result.get("language", "en")
+            })
+
         # Convert audio bytes to base64 to send to frontend
         audio_b64 = None
         if result.get("ai_audio"):
-            audio_b64 = base64.b64encode(result["ai_audio"]).decode('utf-8')
+            audio = result["ai_audio"]
+            audio_b64 = (audio if pre_encoded else base64.b64encode(audio)).decode('utf-8')
 
         return jsonify({
             "success": True,
@@ -427,6 +550,12 @@ def voice_chat():
             "audio_b64": audio_b64,
             "language": result.get("language", "en")
         })
+    except RequestEntityTooLarge as e:
+        return jsonify({
+            "success": False,
+            "error": e.description,
+            "hint": "Please record a shorter message."
+        }), 413
     except Exception as e:
         print(f"Voice Chat Error: {e}")
         import traceback
@@ -437,43 +566,160 @@ def voice_chat():
             "hint": "Please check your microphone and try again."
         }), 500
 
+@app.route('/voice/audio/<audio_id>', methods=['GET'])
+@cross_origin()
+def voice_audio(audio_id):
+    """Raw MP3 of a reply from /voice/chat?audio_mode=url, with Range and ETag support."""
+    audio = voice_copilot.get_audio(audio_id) if hasattr(voice_copilot, 'get_audio') else None
+    if not audio:
+        return jsonify({"success": False, "error": "Audio not found or expired"}), 404
+    response = app.response_class(audio, mimetype='audio/mpeg')
+    # Ids are content hashes, so a clip never changes under its URL
+    response.set_etag(audio_id)
+    response.cache_control.public = True
+    response.cache_control.max_age = 86400
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(audio))
+
+
+@app.route('/voice/stream', methods=['POST', 'OPTIONS'])
+@cross_origin()
+def voice_stream():
+    """Pipelined /voice/chat as Server-Sent Events.
+
+    Sends "transcript" once, then "text" for each sentence of the answer and
+    "audio" events carrying that sentence's MP3 chunks (base64) while TTS is
+    still running, then "done". The client can start playback on the first
+    audio event instead of waiting for the whole reply.
+    """
+    try:
+        if request.method == 'OPTIONS':
+            return jsonify({'status': 'ok'}), 200
+
+        if 'audio' not in request.files:
+            return jsonify({
+                "success": False,
+                "error": "No audio file provided. Please record your voice."
+            }), 400
+
+        upload = ingest_upload(request.files['audio'], MAX_AUDIO_BYTES)
+
+        if upload.size < 100:  # Too small to be valid audio
+            return jsonify({
+                "success": False,
+                "error": "Audio file too small. Please record again."
+            }), 400
+
+        if not voice_copilot or not hasattr(voice_copilot, 'stream_voice_query'):
+            return jsonify({
+                "success": False,
+                "error": "Voice streaming not available"
+            }), 500
+
+        language = request.form.get('language', 'auto')
+        # The stream outlives this request's context, so read the upload now
+        audio = upload.read()
+
+        def events():
+            seq = 0
+            try:
+                for event, payload in voice_copilot.stream_voice_query(audio, language):
+                    if event == "audio":
+                        yield sse_event({"seq": seq, "audio_b64": base64.b64encode(payload).decode('ascii')}, "audio")
+                        seq += 1
+                    elif event == "text":
+                        yield sse_event({"text": payload}, "text")
+                    elif event == "error":
+                        yield sse_event({
+                            "success": False,
+                            "error": payload,
+                            "hint": "Please speak clearly and try again. Make sure your microphone is working."
+                        }, "error")
+                    else:
+                        yield sse_event(payload, event)
+            except Exception as e:
+                print(f"Voice Stream Error: {e}")
+                yield sse_event({"success": False, "error": f"Voice processing failed: {str(e)}"}, "error")
+
+        return app.response_class(
+            events(),
+            mimetype='text/event-stream',
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    except RequestEntityTooLarge as e:
+        return jsonify({
+            "success": False,
+            "error": e.description,
+            "hint": "Please record a shorter message."
+        }), 413
+    except Exception as e:
+        print(f"Voice Stream Error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
 # Optional: Fertilizer recommender (if you have the module)
-try:
-    from fertilizer_recommender import FertilizerRecommender
-    fertilizer_recommender = FertilizerRecommender()
+if not POOL_WORKER:
+    try:
+        from fertilizer_recommender import FertilizerRecommender
+        fertilizer_recommender = FertilizerRecommender()
     
-    @app.route('/fertilizer/recommend', methods=['POST', 'OPTIONS'])
-    @cross_origin()
-    def recommend_fertilizer():
-        try:
-            if request.method == 'OPTIONS':
-                return jsonify({'status': 'ok'}), 200
+        @app.route('/fertilizer/recommend', methods=['POST', 'OPTIONS'])
+        @cross_origin()
+        def recommend_fertilizer():
+            try:
+                if request.method == 'OPTIONS':
+                    return jsonify({'status': 'ok'}), 200
                 
-            data = request.json
-            result = fertilizer_recommender.recommend(
-                crop_name=data.get('crop_name'),
-                soil_type=data.get('soil_type'),
-                land_size=data.get('land_size'),
-                growth_stage=data.get('growth_stage', 'Sowing'),
-                soil_test=data.get('soil_test'),
-                prefer_organic=data.get('prefer_organic', False),
-                budget=data.get('budget'),
-                season=data.get('season', 'Kharif')
-            )
-            return jsonify(result)
-        except Exception as e:
-            print(f"Fertilizer Recommendation Error: {e}")
-            return jsonify({"success": False, "error": str(e)}), 500
-except ImportError:
-    print("⚠️ FertilizerRecommender not available")
+                data = request.json
+                result = fertilizer_recommender.recommend(
+                    crop_name=data.get('crop_name'),
+                    soil_type=data.get('soil_type'),
+                    land_size=data.get('land_size'),
+                    growth_stage=data.get('growth_stage', 'Sowing'),
+                    soil_test=data.get('soil_test'),
+                    prefer_organic=data.get('prefer_organic', False),
+                    budget=data.get('budget'),
+                    season=data.get('season', 'Kharif'),
+                    method=data.get('method', 'classic'),
+                    district=data.get('district')
+                )
+                return jsonify(result)
+            except Exception as e:
+                print(f"Fertilizer Recommendation Error: {e}")
+                return jsonify({"success": False, "error": str(e)}), 500
+    
+        @app.route('/fertilizer/recommend/batch', methods=['POST'])
+        @cross_origin()
+        def recommend_fertilizer_batch():
+            """Columnar recommendations for many farms (e.g. a cooperative's members)"""
+            try:
+                data = request.json or {}
+                result = fertilizer_recommender.recommend_batch(
+                    crop_names=data.get('crop_names', []),
+                    soil_types=data.get('soil_types', []),
+                    land_sizes=data.get('land_sizes', []),
+                    soil_test=data.get('soil_test'),
+                    prefer_organic=data.get('prefer_organic', False),
+                    budget=data.get('budget'),
+                    method=data.get('method', 'classic'),
+                    district=data.get('district')
+                )
+                result = {k: v.tolist() if hasattr(v, 'tolist') else v for k, v in result.items()}
+                return jsonify({"success": True, "farms": len(result['crop']), **result})
+            except ValueError as e:
+                return jsonify({"success": False, "error": str(e)}), 400
+            except Exception as e:
+                print(f"Fertilizer Batch Error: {e}")
+                return jsonify({"success": False, "error": str(e)}), 500
+    except ImportError:
+        print("⚠️ FertilizerRecommender not available")
 
 # Optional: ChatAssistant (if you have the module)
-try:
-    from chatbot import ChatAssistant
-    chat_assistant = ChatAssistant()
-    print("✅ ChatAssistant loaded")
-except ImportError:
-    print("⚠️ ChatAssistant not available")
+if not POOL_WORKER:
+    try:
+        from chatbot import ChatAssistant
+        chat_assistant = ChatAssistant()
+        print("✅ ChatAssistant loaded")
+    except ImportError:
+        print("⚠️ ChatAssistant not available")
 
 if __name__ == '__main__':
     # Get port from environment variable (Render/Heroku sets this)
@@ -0,0 +1,140 @@
+import os
+import re
+import time
+import base64
+import sqlite3
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, single dev-server process anyway
+    fcntl = None
+
+from response_cache import DiskStore, make_key
+
+TTS_CACHE_PATH = os.environ.get('TTS_CACHE_PATH', '/tmp/krishimitra/tts_cache.sqlite')
+TTS_CACHE_MAX_BYTES = int(os.environ.get('TTS_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+TTS_CACHE_TTL = int(os.environ.get('TTS_CACHE_TTL', 30 * 24 * 3600))
+# Also keep a base64 copy of each clip, so /voice/chat doesn't re-encode on every hit
+TTS_CACHE_BASE64 = os.environ.get('TTS_CACHE_BASE64', '1') == '1'
+
+# Ids of MP3 clips are bare make_key hashes; other encodings carry a prefix
+_MP3_ID = re.compile(r'[0-9a-f]{32}')
+
+
+class AudioCache:
+    """Synthesized speech on disk, keyed by (text, language, voice, model).
+
+    Stored in a DiskStore (SQLite, shared by every worker), which evicts the
+    least recently used clips once TTS_CACHE_MAX_BYTES is exceeded. With
+    `store_base64`, the base64 form is stored next to the MP3 bytes.
+    """
+
+    def __init__(self, path=TTS_CACHE_PATH, max_bytes=TTS_CACHE_MAX_BYTES, ttl=TTS_CACHE_TTL,
+                 store_base64=TTS_CACHE_BASE64):
+        self.disk = DiskStore(path, max_bytes) if path else None
+        self.ttl = ttl
+        self.store_base64 = store_base64
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text, language, voice, model, encoding='mp3'):
+        key = make_key('tts', text, language, voice, model, encoding)
+        return key if encoding == 'mp3' else f'{encoding}-{key}'
+
+    def _get(self, key):
+        try:
+            return self.disk.get(key)
+        except sqlite3.Error as e:
+            print(f"TTS Cache Error: {e}")
+            return None
+
+    def get(self, text, language, voice, model, encoded=False):
+        """MP3 bytes (or base64 bytes with `encoded`) for this clip, or None."""
+        if self.disk is None:
+            return None
+        value = None
+        if encoded and self.store_base64:
+            value = self._get(self.key(text, language, voice, model, 'base64'))
+        if value is None:
+            value = self._get(self.key(text, language, voice, model))
+            if value is not None and encoded:
+                value = base64.b64encode(value)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, text, language, voice, model, audio):
+        """Store a clip; returns its id (the MP3 key), or None if it wasn't stored."""
+        if self.disk is None or not audio:
+            return None
+        expires = time.time() + self.ttl
+        key = self.key(text, language, voice, model)
+        try:
+            self.disk.put(key, audio, expires)
+            if self.store_base64:
+                self.disk.put(self.key(text, language, voice, model, 'base64'), base64.b64encode(audio), expires)
+        except sqlite3.Error as e:
+            print(f"TTS Cache Error: {e}")
+            return None
+        return key
+
+    def fetch(self, audio_id):
+        """MP3 bytes by clip id (as handed out for /voice/audio/<id>), or None.
+
+        Only MP3 ids are served; the base64 copies are never handed out.
+        """
+        if self.disk is None or not _MP3_ID.fullmatch(audio_id or ''):
+            return None
+        return self._get(audio_id)
+
+    def contains(self, text, language, voice, model):
+        if self.disk is None:
+            return False
+        try:
+            return self.disk.contains(self.key(text, language, voice, model))
+        except sqlite3.Error as e:
+            print(f"TTS Cache Error: {e}")
+            return False
+
+    def warm_lock(self):
+        """Non-blocking lock on a file next to the cache, so one worker warms it.
+
+        Returns the open lock file (close it to release), or None if another
+        worker holds it or there is no disk cache.
+        """
+        if self.disk is None:
+            return None
+        lock = None
+        try:
+            folder = os.path.dirname(self.disk.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            lock = open(self.disk.path + '.warm.lock', 'w')
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return lock
+        except OSError:
+            if lock is not None:
+                lock.close()
+            return None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            data = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "base64": self.store_base64
+            }
+        if self.disk is not None:
+            try:
+                data["disk"] = self.disk.stats()
+            except sqlite3.Error as e:
+                data["disk"] = {"error": str(e)}
+        return data
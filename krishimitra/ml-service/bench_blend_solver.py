@@ -0,0 +1,67 @@
+"""
+KrishiMitra Fertilizer Blend Benchmark
+Compares the classic DAP/MOP/Urea schedule with the minimum-cost blend
+solver on every crop and soil: total cost, the worst-supplied nutrient
+under a tight budget, and time per (uncached) plan
+Usage: python bench_blend_solver.py [iterations] [budget]
+"""
+
+import sys
+import time
+
+from fertilizer_recommender import FertilizerRecommender
+
+NUTRIENTS = (('nitrogen', 'N'), ('phosphorus', 'P'), ('potassium', 'K'))
+
+
+def worst_coverage(result):
+    """Smallest supplied / needed share over N, P and K (1.0 = every need met)."""
+    needs = result['nutrient_summary']
+    shares = []
+    for name, key in NUTRIENTS:
+        if needs[name] > 0:
+            supplied = sum(item['npk_provided'][key] for item in result['fertilizer_plan'])
+            shares.append(min(supplied / needs[name], 1.0))
+    return min(shares) if shares else 1.0
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 1500
+    recommender = FertilizerRecommender()
+    cases = [(crop, soil) for crop in recommender.crop_requirements for soil in recommender.soil_profiles]
+
+    print("\n" + "=" * 60)
+    print(f"🧪 FERTILIZER BLEND BENCHMARK ({len(cases)} crop/soil cases, 2 acres)")
+    print("=" * 60)
+
+    for method in ('classic', 'solver'):
+        cost = 0.0
+        coverage = []
+        for crop, soil in cases:
+            cost += recommender.recommend(crop, soil, 2, 'Sowing', method=method)['total_cost']
+            tight = recommender.recommend(crop, soil, 2, 'Sowing', budget=budget, method=method)
+            coverage.append(worst_coverage(tight))
+
+        # Uncached, so repeats time the planning rather than the plan memo
+        kb = recommender.kb
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for crop, soil in cases:
+                recommender._recommend(kb, crop, soil, 2, 'Sowing', None, False, budget, 'Kharif', method)
+        per_call_us = (time.perf_counter() - start) / (iterations * len(cases)) * 1e6
+
+        print(f"\n🌾 {method}")
+        print(f"   Full-need cost:               ₹{cost / len(cases):10,.0f} per plan")
+        print(f"   Worst nutrient at ₹{budget:,.0f}:    {sum(coverage) / len(coverage) * 100:6.1f}% of need (mean)")
+        print(f"   Plan (no memo):               {per_call_us:8.1f} us per call")
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        recommender._solve_schedule(recommender.kb, {'nitrogen': 100, 'phosphorus': 50, 'potassium': 40}, False, budget, 2)
+    print(f"\n⚙️  Solver + schedule alone: {(time.perf_counter() - start) / iterations * 1e6:.1f} us per call")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
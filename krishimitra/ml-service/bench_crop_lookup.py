@@ -0,0 +1,92 @@
+"""
+KrishiMitra Crop Lookup Benchmark
+Compares the old crop resolution (exact key, then a lower-cased scan over
+every crop) and nutrient-need arithmetic (crop dict, soil dict, float by
+float) with the index built at construction (normalized name/alias map and
+the crop x soil needs table), and checks both give the same needs.
+Aliases the old code could not resolve have no legacy baseline: their
+timing is the cost of the new behavior, not a speed-up. Names that miss
+every dict lookup ("my tomato field") pay for normalization before the
+substring scan, so that path costs about what the old lower-cased scan did
+Usage: python bench_crop_lookup.py [iterations]
+"""
+
+import sys
+import time
+
+from fertilizer_recommender import FertilizerRecommender
+
+QUERIES = [
+    ("exact", "Rice", "Black soil"),
+    ("lower case", "sugarcane", "Red soil"),
+    ("alias", "paddy", "Alluvial soil"),
+    ("Hindi alias", "गेहूं", "Clay soil"),
+    ("sentence", "my tomato field", "Laterite soil"),
+]
+
+
+def legacy_needs(recommender, crop_name, soil_type, land_size):
+    """recommend()'s crop match + _calculate_nutrient_needs as they were."""
+    if crop_name not in recommender.crop_requirements:
+        matched = False
+        for c in recommender.crop_requirements:
+            if c.lower() in crop_name.lower():
+                crop_name = c
+                matched = True
+                break
+        if not matched:
+            return None
+    crop_req = recommender.crop_requirements[crop_name]
+    n_need = crop_req['N'] * land_size
+    p_need = crop_req['P'] * land_size
+    k_need = crop_req['K'] * land_size
+    if soil_type in recommender.soil_profiles:
+        profile = recommender.soil_profiles[soil_type]
+        n_need *= (1 - profile['N'])
+        p_need *= (1 - profile['P'])
+        k_need *= (1 - profile['K'])
+    return {'nitrogen': round(n_need, 2), 'phosphorus': round(p_need, 2), 'potassium': round(k_need, 2)}
+
+
+def indexed_needs(recommender, crop_name, soil_type, land_size):
+    kb = recommender.kb
+    crop = kb.resolve_crop(crop_name)
+    if crop is None:
+        return None
+    return recommender._calculate_nutrient_needs(kb, crop, soil_type, land_size, None)
+
+
+def time_it(fn, args, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(*args)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    recommender = FertilizerRecommender()
+
+    print("\n" + "=" * 60)
+    print(f"🧪 CROP LOOKUP BENCHMARK ({iterations} calls each)")
+    print("=" * 60)
+    for label, crop, soil in QUERIES:
+        args = (recommender, crop, soil, 2.5)
+        legacy_us = time_it(legacy_needs, args, iterations) * 1e6
+        indexed_us = time_it(indexed_needs, args, iterations) * 1e6
+        old, new = legacy_needs(*args), indexed_needs(*args)
+        print(f"   {label:12s} {crop!r:18s} legacy {legacy_us:6.2f} us -> {'found' if old else 'not found':9s} "
+              f"indexed {indexed_us:6.2f} us -> {'found' if new else 'not found':9s} "
+              f"{'new (no baseline)' if old is None and new else 'same needs' if old == new else 'DIFFERENT'}")
+
+    # Every crop x soil pair must give the same needs as before
+    mismatches = sum(
+        legacy_needs(recommender, c, s, 3.7) != indexed_needs(recommender, c, s, 3.7)
+        for c in recommender.crop_requirements for s in recommender.soil_profiles
+    )
+    print(f"\n🎯 crop x soil pairs with different needs: {mismatches}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
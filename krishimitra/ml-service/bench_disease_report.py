@@ -0,0 +1,211 @@
+"""
+KrishiMitra Disease Report Serialization Benchmark
+Compares building + serializing the full /analyze-disease dict per request
+against splicing dynamic fields into pre-serialized static fragments
+Usage: python bench_disease_report.py [iterations]
+"""
+
+import sys
+import json
+import time
+import random
+
+from disease_report import render_disease_report
+
+STATS = {"lesion_fraction": 0.12, "cluster_count": 3, "mean_intensity": 118.4}
+BOXES = [
+    {"top": 16, "left": 16, "width": 8, "height": 11, "color": "#EF4444"},
+    {"top": 58, "left": 84, "width": 6, "height": 9, "color": "#EF4444"},
+    {"top": 42, "left": 42, "width": 4, "height": 6, "color": "#F97316"}
+]
+
+
+def legacy_build_disease_report(boxes, soil_type, weather_input):
+    """Original per-request dict builder (kept here for comparison only)."""
+    # Basic logic: if many boxes, severity is high
+    severity = "Moderate"
+    if len(boxes) > 5: severity = "High"
+    elif len(boxes) < 2: severity = "Low"
+
+    # --- MULTI-MODAL LOGIC SIMULATION ---
+    # 1. Advisory generation (Simulating LLM)
+    advisory_text = "Based on the visual evidence of lesions"
+    if "Blight" in (("Bacterial Leaf Blight" if len(boxes) > 0 else "Healthy Leaf")):
+        advisory_text += ", the crop is suffering from Bacterial Blight."
+        if "Black" in soil_type:
+            advisory_text += " Since you have Black soil which retains moisture, avoid over-watering immediately to prevent bacterial spread."
+        elif "Red" in soil_type:
+            advisory_text += " For Red soil, ensure drainage is adequate."
+
+        if "Rain" in weather_input or "Cloudy" in weather_input:
+            advisory_text += " With humid/rainy weather detected, the bacteria can spread rapidly. Application of bactericides is critical TODAY."
+        else:
+            advisory_text += " Since weather is clear, you have a 24-hour window to apply treatment before it worsens."
+    else:
+         advisory_text = "Your crop looks healthy! Continue monitoring weekly."
+
+    # 2. RL/ML Simulation for Action Plan
+    # Heuristic: High Severity + Humid Weather = Immediate Action
+    urgency_score = len(boxes) * 10 
+    if "Rain" in weather_input: urgency_score += 20
+
+    harvest_prediction = "15-20 days"
+    irrigation_advice = "Normal schedule"
+    if urgency_score > 50:
+        irrigation_advice = "STOP Irrigation for 48h"
+        harvest_prediction = "Delayed by 5-7 days due to stress"
+
+    data = {
+        "success": True,
+        "disease": "Bacterial Leaf Blight" if len(boxes) > 0 else "Healthy Leaf",
+        "confidence": f"{random.randint(88, 97)}%",
+        "severity": severity,
+        "reason": f"Combined Factors: {weather_input} Weather + Pathogen Presence",
+        "cause": "Caused by Xanthomonas bacteria." if len(boxes) > 0 else "Overall healthy.",
+        "symptoms": [
+            "Water-soaked stripes",
+            "Yellow lesions"
+        ] if len(boxes) > 0 else ["No symptoms"],
+        "boxes": boxes,
+
+        # --- NEW MULTI-MODAL FIELDS ---
+        "smart_advisory": advisory_text,
+        "action_plan": {
+            "irrigation": irrigation_advice,
+            "harvest_impact": harvest_prediction,
+            "fertilizer": "Avoid Nitrogen (Urea) now" if len(boxes) > 0 else "Apply NPK 10:26:26"
+        },
+
+        "damage_assessment": {
+            "affected_area": f"{random.randint(25, 35)}%",
+            "spread_rate": "High" if urgency_score > 40 else "Moderate",
+            "potential_loss": "15-25%",
+            "urgency": "CRITICAL: Act within 24h" if urgency_score > 50 else "Monitor closely"
+        },
+        "economics": {
+            "treatment_cost": "₹700",
+            "potential_loss_value": "₹12,500",
+            "roi": "18x Return",
+            "recommendation": "Treat to save yield"
+        },
+        "weather_timing": {
+            "best_time": "Late Afternoon (post 4 PM)" if "Sunny" in weather_input else "Wait for dry spell",
+            "reason": f"Based on {weather_input} forecast to maximize absorption.",
+            "forecast": f"{weather_input} currently."
+        },
+        "community": {
+            "nearby_cases": random.randint(5, 15),
+            "success_rate": "82%",
+            "top_tip": "Add garlic paste to neem spray for better adhesion (Ramesh Patil, Expert Farmer)"
+        },
+        "recovery_tracking": {
+            "timeline": [
+                {"day": 0, "status": "30% affected", "icon": "🔴"},
+                {"day": 3, "status": "Upload to track progress", "icon": "📸"},
+                {"day": 7, "status": "Expected 10% affected", "icon": "📉"},
+                {"day": 10, "status": "Full Recovery Expected", "icon": "✅"}
+            ]
+        },
+        "prevention": {
+            "factors": ["High Humidity (>80%)", "Dense Planting", "Overhead Irrigation"],
+            "next_season": [
+                "Plant resistant varieties (IR-24 or similar)",
+                "Increase row spacing to 20cm",
+                "Spray preventive copper at flowering stage",
+                "Remove infected plant debris immediately"
+            ]
+        },
+        "additional_issues": [
+            {"name": "Aphid Infestation", "confidence": "72%", "severity": "Minor"}
+        ] if random.random() > 0.5 else [],
+
+        # --- END ENHANCED FIELDS ---
+
+        "treatments": {
+            "organic": {
+                "name": "Neem Oil & Balanced Nutrition",
+                "price": "₹200/liter",
+                "usage": "Spray Neem oil (5ml/L).",
+                "effectiveness": "85%",
+                "benefits": ["Safe for bees", "Zero harvest waiting", "Improves soil"],
+                "steps": [
+                    "Mix 5ml Neem oil with 1 liter of fresh water.",
+                    "Add 2-3 drops of liquid soap to help mixing.",
+                    "Spray thoroughly on both sides of the leaves.",
+                    "Repeat every 7 days during early morning or late evening."
+                ]
+            },
+            "chemical": {
+                "name": "Copper Oxychloride + Streptocycline",
+                "price": "₹450/kg",
+                "usage": "Mix 2.5g COC and 0.5g Streptocycline per liter.",
+                "effectiveness": "95%",
+                "benefits": ["Fast action", "Kills bacteria on contact", "Rainfastness"],
+                "steps": [
+                    "Dissolve 0.5g Streptocycline in a small amount of water first.",
+                    "Add it to 1 liter water and mix 2.5g Copper Oxychloride.",
+                    "Apply as a foliar spray focusing on infected patches.",
+                    "Avoid spraying during high winds or rain."
+                ]
+            }
+        },
+        "shops": [
+            {"name": "Shri Ganesh Agri Store", "dist": "2.3 km", "phone": "98220XXXXX", "location": "MIDC Central Market, Nashik"},
+            {"name": "Farmers Pride Shop", "dist": "4.1 km", "phone": "90110XXXXX", "location": "Shivaji Nagar Square, Opp. Railway Station"}
+        ]
+    }
+    return data
+
+
+def legacy_render(boxes, soil_type, weather_input):
+    # What jsonify() did: Flask's default provider sorts keys and escapes non-ASCII
+    return json.dumps(legacy_build_disease_report(boxes, soil_type, weather_input),
+                      ensure_ascii=True, sort_keys=True).encode('utf-8')
+
+
+def spliced_render(boxes, soil_type, weather_input):
+    return render_disease_report(boxes, STATS, soil_type, weather_input)
+
+
+def shape(obj):
+    """Keys of every nested dict, ignoring values (the values are now derived, not random)."""
+    if isinstance(obj, dict):
+        return {k: shape(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [shape(v) for v in obj[:1]]
+    return None
+
+
+def time_it(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(BOXES, "Black", "Rain")
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    random.seed(1)
+    before = shape(json.loads(legacy_render(BOXES, "Black", "Rain")))
+    after = shape(json.loads(spliced_render(BOXES, "Black", "Rain")))
+    # Fields added since the legacy builder
+    after.pop("lesion_stats", None)
+    after["damage_assessment"].pop("urgency_score", None)
+    after["additional_issues"] = before["additional_issues"]
+    same = before == after
+
+    legacy_us = time_it(legacy_render, iterations)
+    spliced_us = time_it(spliced_render, iterations)
+
+    print("\n" + "=" * 60)
+    print("🧪 DISEASE REPORT SERIALIZATION BENCHMARK (%d calls)" % iterations)
+    print("=" * 60)
+    print(f"   dict + json.dumps: {legacy_us:8.1f} us/call  {len(legacy_render(BOXES, 'Black', 'Rain'))} bytes")
+    print(f"   Spliced template:  {spliced_us:8.1f} us/call  {len(spliced_render(BOXES, 'Black', 'Rain'))} bytes")
+    print(f"   Speed-up: {legacy_us / spliced_us:.1f}x   Same fields: {'✅' if same else '❌'}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
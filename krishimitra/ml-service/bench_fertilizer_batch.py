@@ -0,0 +1,72 @@
+"""
+KrishiMitra Fertilizer Batch Benchmark
+Compares a per-farm loop over FertilizerRecommender.recommend with one
+recommend_batch call on the same synthetic cooperative, and checks that
+both give the same product totals
+Usage: python bench_fertilizer_batch.py [farms]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from fertilizer_recommender import FertilizerRecommender
+
+
+def make_farms(recommender, farms, seed=7):
+    rng = np.random.default_rng(seed)
+    crops = rng.choice(list(recommender.crop_requirements), farms)
+    soils = rng.choice(list(recommender.soil_profiles), farms)
+    land = np.round(rng.uniform(0.5, 10, farms), 1)
+    soil_test = {
+        'nitrogen': np.round(rng.uniform(100, 500, farms)),
+        'phosphorus': np.round(rng.uniform(2, 30, farms), 1),
+        'potassium': np.round(rng.uniform(50, 400, farms)),
+    }
+    budgets = np.round(rng.uniform(500, 8000, farms))
+    return crops, soils, land, soil_test, budgets
+
+
+def per_farm(recommender, crops, soils, land, soil_test, budgets, method):
+    plans = []
+    for i in range(len(crops)):
+        test = {k: float(v[i]) for k, v in soil_test.items()}
+        plans.append(recommender.recommend(
+            crops[i], soils[i], float(land[i]), 'Sowing', soil_test=test,
+            budget=float(budgets[i]), method=method
+        ))
+    return plans
+
+
+def main():
+    farms = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    recommender = FertilizerRecommender()
+    crops, soils, land, soil_test, budgets = make_farms(recommender, farms)
+
+    print("\n" + "=" * 60)
+    print(f"🧪 FERTILIZER BATCH BENCHMARK ({farms} farms)")
+    print("=" * 60)
+
+    for method in ('classic', 'solver'):
+        start = time.perf_counter()
+        plans = per_farm(recommender, crops, soils, land, soil_test, budgets, method)
+        loop_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = recommender.recommend_batch(crops, soils, land, soil_test=soil_test, budget=budgets, method=method)
+        batch_s = time.perf_counter() - start
+
+        worst = 0.0
+        for i, plan in enumerate(plans):
+            worst = max(worst, abs(plan['total_cost'] - batch['total_cost'][i]))
+
+        print(f"\n🌾 {method}")
+        print(f"   Per-farm loop:  {loop_s * 1000:9.1f} ms  ({farms / loop_s:10,.0f} farms/s)")
+        print(f"   recommend_batch:{batch_s * 1000:9.1f} ms  ({farms / batch_s:10,.0f} farms/s)")
+        print(f"   Speedup:        {loop_s / batch_s:9.1f}x   max cost difference ₹{worst:.2f}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+KrishiMitra Fertilizer Plan Cache Benchmark
+Replays skewed traffic (a few popular crop/soil/size combinations, a long
+tail of others) through FertilizerRecommender.recommend with and without
+the plan memo, and checks a caller mutating its plan can't touch the cache
+Usage: python bench_fertilizer_cache.py [requests] [method]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from fertilizer_recommender import FertilizerRecommender
+
+
+def make_traffic(recommender, count, seed=11):
+    rng = np.random.default_rng(seed)
+    crops = list(recommender.crop_requirements)
+    soils = list(recommender.soil_profiles)
+    # Zipf-ish popularity over crop x soil x land size (0.5-10 acres, 0.1 steps)
+    combos = [(c, s, land / 10) for c in crops for s in soils for land in range(5, 101, 5)]
+    weights = 1.0 / np.arange(1, len(combos) + 1) ** 1.1
+    picks = rng.choice(len(combos), count, p=weights / weights.sum())
+    return [combos[i] for i in picks]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    method = sys.argv[2] if len(sys.argv) > 2 else 'solver'
+    recommender = FertilizerRecommender()
+    traffic = make_traffic(recommender, count)
+
+    print("\n" + "=" * 60)
+    print(f"🧪 FERTILIZER PLAN CACHE BENCHMARK ({count} requests, {method})")
+    print("=" * 60)
+
+    kb = recommender.kb
+    start = time.perf_counter()
+    for crop, soil, land in traffic:
+        recommender._recommend(kb, crop, soil, land, 'Sowing', None, False, 3000, 'Kharif', method)
+    plain_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for crop, soil, land in traffic:
+        recommender.recommend(crop, soil, land, 'Sowing', budget=3000, method=method)
+    cached_s = time.perf_counter() - start
+
+    stats = recommender.cache_stats()
+    print(f"\n   Without memo: {plain_s / count * 1e6:7.1f} us per request")
+    print(f"   With memo:    {cached_s / count * 1e6:7.1f} us per request ({plain_s / cached_s:.1f}x)")
+    print(f"   Hit ratio:    {stats['hit_ratio'] * 100:6.1f}%  ({stats['entries']} plans, {stats['bytes'] / 1024:.0f} KB)")
+
+    # A caller scribbling on its plan must not change the next caller's
+    crop, soil, land = traffic[0]
+    first = recommender.recommend(crop, soil, land, 'Sowing', budget=3000, method=method)
+    first['fertilizer_plan'][0]['quantity_kg'] = -1
+    again = recommender.recommend(crop, soil, land, 'Sowing', budget=3000, method=method)
+    print(f"   Defensive copy: {'ok' if again['fertilizer_plan'][0]['quantity_kg'] != -1 else 'BROKEN'}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
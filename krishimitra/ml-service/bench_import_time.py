@@ -0,0 +1,109 @@
+"""
+KrishiMitra Import-Time Benchmark
+Runs `python -X importtime -c "import app"` in fresh interpreters, reports
+the total and the slowest top-level imports, and appends the result to a
+history file so cold-start regressions show up over time
+Usage: python bench_import_time.py [runs] [--history import_time_history.jsonl]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HISTORY = os.path.join(HERE, "import_time_history.jsonl")
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_profile(module="app"):
+    """({module imported directly by `module`: cumulative us}, total us) for one cold import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE, capture_output=True, text=True
+    )
+    children = {}
+    for line in proc.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, name = match.groups()
+        # Children are printed before their parent, one indent level deeper
+        if len(indent) == 3:
+            children[name] = children.get(name, 0) + int(cumulative)
+        elif len(indent) == 1:
+            if name == module:
+                return children, int(cumulative)
+            children = {}
+    raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    args = sys.argv[1:]
+    history_path = DEFAULT_HISTORY
+    if "--history" in args:
+        i = args.index("--history")
+        history_path = args[i + 1]
+        del args[i:i + 2]
+    runs = int(args[0]) if args else 5
+
+    print("\n" + "=" * 60)
+    print("🧪 IMPORT-TIME BENCHMARK (python -X importtime -c 'import app')")
+    print("=" * 60)
+
+    totals = []
+    best = {}
+    for _ in range(runs):
+        tops, total = import_profile()
+        totals.append(total)
+        for name, us in tops.items():
+            best[name] = min(us, best.get(name, us))
+    totals.sort()
+    median_ms = totals[len(totals) // 2] / 1000
+
+    print(f"\n⏱️  import app: median {median_ms:.1f} ms over {runs} runs "
+          f"(min {totals[0] / 1000:.1f}, max {totals[-1] / 1000:.1f})")
+    print("\n🐢 Slowest imports under app (best of runs):")
+    for name, us in sorted(best.items(), key=lambda kv: -kv[1])[:10]:
+        print(f"   {name:32s} {us / 1000:8.1f} ms")
+
+    history = load_history(history_path)
+    if history:
+        previous = history[-1]
+        delta = median_ms - previous["median_ms"]
+        print(f"\n📈 vs {previous.get('revision') or 'previous run'}: {delta:+.1f} ms")
+
+    entry = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "runs": runs,
+        "median_ms": round(median_ms, 1),
+        "top": {k: round(v / 1000, 1) for k, v in sorted(best.items(), key=lambda kv: -kv[1])[:10]}
+    }
+    with open(history_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+    print(f"📝 Recorded in {os.path.relpath(history_path)}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+KrishiMitra Knowledge Base Reload Benchmark
+Writes a synthetic knowledge base (the real crops and soils, thousands of
+products, district price lists) to a temp folder, times a full load + index
+build and a reload after a price edit (only fertilizers.json is read again,
+the other indexes are reused), then measures request latency while the
+files keep changing under worker threads that are serving recommendations.
+On a 1-CPU sandbox: ~50-55 ms per full load, 15-19 ms per price-edit reload
+alone, and 45-80 ms per background reload while four threads serve
+requests, since they all share the GIL. Requests run in the same process,
+so the latency percentiles include that contention but not a real server's
+I/O or process scheduling
+Usage: python bench_kb_reload.py [products] [districts] [seconds]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+from fertilizer_kb import KnowledgeBase, KnowledgeBaseStore, KB_DATA_DIR
+from fertilizer_recommender import FertilizerRecommender
+
+THREADS = 4
+
+
+def write_knowledge_base(folder, products, districts, seed=3):
+    rng = np.random.default_rng(seed)
+    for name in ('crop_nutrients.json', 'soil_profiles.json'):
+        shutil.copy(os.path.join(KB_DATA_DIR, name), folder)
+    with open(os.path.join(KB_DATA_DIR, 'fertilizers.json'), encoding='utf-8') as f:
+        fertilizers = json.load(f)
+    for i in range(products - len(fertilizers)):
+        npk = (rng.integers(0, 47, 3) * (rng.random(3) > 0.4)).tolist()
+        fertilizers.append({'name': f'Product {i}', 'npk': npk, 'type': 'chemical',
+                            'price': round(float(rng.uniform(5, 40)), 2)})
+    prices = {}
+    for d in range(districts):
+        picks = rng.choice(len(fertilizers), 40, replace=False)
+        prices[f'District {d}'] = {fertilizers[i]['name']: round(fertilizers[i]['price'] * float(rng.uniform(0.9, 1.1)), 2)
+                                   for i in picks}
+    with open(os.path.join(folder, 'fertilizers.json'), 'w', encoding='utf-8') as f:
+        json.dump(fertilizers, f)
+    with open(os.path.join(folder, 'district_prices.json'), 'w', encoding='utf-8') as f:
+        json.dump(prices, f)
+    return fertilizers
+
+
+def serve(recommender, stop, latencies, seed):
+    rng = np.random.default_rng(seed)
+    crops = list(recommender.crop_requirements)
+    while not stop.is_set():
+        start = time.perf_counter()
+        # Varied land sizes and districts, so most requests miss the plan memo
+        recommender.recommend(crops[rng.integers(len(crops))], 'Black soil', float(rng.integers(5, 500)) / 10,
+                              'Sowing', district=f'District {rng.integers(50)}')
+        latencies.append(time.perf_counter() - start)
+
+
+def percentiles(values):
+    ms = np.array(values) * 1000
+    return f"p50 {np.percentile(ms, 50):6.2f} ms  p99 {np.percentile(ms, 99):6.2f} ms  max {ms.max():6.2f} ms"
+
+
+def main():
+    products = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    districts = int(sys.argv[2]) if len(sys.argv) > 2 else 700
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 3
+    folder = tempfile.mkdtemp(prefix='kb_bench_')
+
+    print("\n" + "=" * 60)
+    print(f"🧪 KNOWLEDGE BASE RELOAD BENCHMARK ({products} products, {districts} districts)")
+    print("=" * 60)
+    try:
+        fertilizers = write_knowledge_base(folder, products, districts)
+        loads = []
+        for _ in range(5):
+            start = time.perf_counter()
+            KnowledgeBase.from_dir(folder)
+            loads.append(time.perf_counter() - start)
+        print(f"\n📦 Load + index: {sorted(loads)[2] * 1000:.1f} ms (median of 5)")
+
+        kb = KnowledgeBase.from_dir(folder)
+        reloads = []
+        for _ in range(5):
+            start = time.perf_counter()
+            KnowledgeBase.from_dir(folder, kb.version + 1, kb, {'fertilizers.json'})
+            reloads.append(time.perf_counter() - start)
+        print(f"📦 Reload after a product file edit: {sorted(reloads)[2] * 1000:.1f} ms (median of 5)")
+
+        recommender = FertilizerRecommender(folder)
+        recommender.kb_store = KnowledgeBaseStore(folder, interval=0.05)
+        for phase in ('steady', 'reloading'):
+            stop = threading.Event()
+            latencies = []
+            workers = [threading.Thread(target=serve, args=(recommender, stop, latencies, i)) for i in range(THREADS)]
+            for w in workers:
+                w.start()
+            deadline = time.time() + seconds
+            edits = 0
+            while time.time() < deadline:
+                if phase == 'reloading':
+                    # Bump Urea's price and rewrite the product file, as an admin edit would
+                    fertilizers[0]['price'] = round(6.5 + 0.01 * edits, 2)
+                    tmp = os.path.join(folder, 'fertilizers.json.tmp')
+                    with open(tmp, 'w', encoding='utf-8') as f:
+                        json.dump(fertilizers, f)
+                    os.replace(tmp, os.path.join(folder, 'fertilizers.json'))
+                    edits += 1
+                time.sleep(0.25)
+            stop.set()
+            for w in workers:
+                w.join()
+            print(f"\n🌾 {phase:9s} {len(latencies):6d} requests  {percentiles(latencies)}")
+        stats = recommender.kb_store.stats()
+        print(f"   {edits} edits -> {stats['reloads']} reloads, last {stats['last_reload_ms']} ms, "
+              f"serving v{stats['version']}")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
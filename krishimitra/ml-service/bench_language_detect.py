@@ -0,0 +1,89 @@
+"""
+KrishiMitra Language Detection Benchmark
+Compares the old detect_language (nine regex searches, first match wins)
+with script_detect.classify on short and long messages, and checks Hindi vs
+Marathi on a few labelled questions. classify answers pure ASCII without a
+scan, settles single-script text with two regex scans of a bounded prefix,
+and only counts scripts for mixed text. Devanagari then pays for the
+Hindi/Marathi model (tens of microseconds), which the old first-match
+check skipped by always answering Hindi
+Usage: python bench_language_detect.py [iterations]
+"""
+
+import re
+import sys
+import time
+
+from script_detect import classify
+
+LEGACY_PATTERNS = {
+    'hi': re.compile(r'[\u0900-\u097F]'),
+    'ta': re.compile(r'[\u0B80-\u0BFF]'),
+    'te': re.compile(r'[\u0C00-\u0C7F]'),
+    'mr': re.compile(r'[\u0900-\u097F]'),
+    'kn': re.compile(r'[\u0C80-\u0CFF]'),
+    'ml': re.compile(r'[\u0D00-\u0D7F]'),
+    'gu': re.compile(r'[\u0A80-\u0AFF]'),
+    'bn': re.compile(r'[\u0980-\u09FF]'),
+    'pa': re.compile(r'[\u0A00-\u0A7F]'),
+}
+
+
+def legacy_detect(text):
+    """detect_language as it was: the first pattern with any match wins."""
+    if not text or text.strip() == "":
+        return 'en'
+    for lang_code, pattern in LEGACY_PATTERNS.items():
+        if pattern.search(text):
+            return lang_code
+    return 'en'
+
+
+MESSAGES = {
+    "English": "My wheat crop has yellow leaves and brown spots after the rain, what should I spray? ",
+    "Hindi": "मेरी गेहूं की फसल में बारिश के बाद पत्ते पीले हो गए हैं और भूरे धब्बे हैं, क्या छिड़कूं? ",
+    "Marathi": "पावसानंतर माझ्या गव्हाच्या पिकाची पाने पिवळी झाली आहेत आणि तपकिरी डाग आहेत, काय फवारू? ",
+    "Punjabi": "ਮੀਂਹ ਤੋਂ ਬਾਅਦ ਮੇਰੀ ਕਣਕ ਦੇ ਪੱਤੇ ਪੀਲੇ ਹੋ ਗਏ ਹਨ, ਕੀ ਛਿੜਕਾਂ? ",
+    "Code-mixed": "मेरी wheat crop में rain के बाद yellow leaves हैं, kya spray karun? ",
+}
+
+LABELLED = [
+    ("गेहूं कैसे उगाएं?", "hi"), ("मेरे टमाटर के पौधे सूख रहे हैं", "hi"),
+    ("कपास की फसल में सफेद मक्खी लगी है क्या करें", "hi"), ("आज मौसम कैसा रहेगा", "hi"),
+    ("माझ्या टोमॅटोची झाडे सुकत आहेत", "mr"), ("भाताला कोणते खत द्यावे", "mr"),
+    ("कापसावर पांढरी माशी आली आहे काय करावे", "mr"), ("आज हवामान कसे असेल", "mr"),
+]
+
+
+def time_it(fn, text, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(text)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print("\n" + "=" * 60)
+    print("🧪 LANGUAGE DETECTION BENCHMARK")
+    print("=" * 60)
+
+    for size in (200, 5000):
+        print(f"\n📨 Messages of ~{size} characters ({iterations} calls each)")
+        for name, sentence in MESSAGES.items():
+            text = (sentence * (size // len(sentence) + 1))[:size]
+            legacy_us = time_it(legacy_detect, text, iterations) * 1e6
+            new_us = time_it(classify, text, iterations) * 1e6
+            lang, script, confidence = classify(text)
+            print(f"   {name:11s} legacy {legacy_us:8.1f} us -> {legacy_detect(text)}   "
+                  f"classify {new_us:8.1f} us -> {lang} ({script}, {confidence:.2f})")
+
+    legacy_ok = sum(legacy_detect(text) == want for text, want in LABELLED)
+    new_ok = sum(classify(text)[0] == want for text, want in LABELLED)
+    print(f"\n🎯 Hindi/Marathi questions correct: legacy {legacy_ok}/{len(LABELLED)}, "
+          f"classify {new_ok}/{len(LABELLED)}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+KrishiMitra Lesion Detector Micro-Benchmark
+Compares the vectorized grid scan against the old per-pixel Python loop,
+and full-resolution decoding against draft-mode decoding of uploads
+Usage: python bench_lesion_detector.py [runs]
+"""
+
+import io
+import sys
+import time
+import resource
+import multiprocessing
+import numpy as np
+from PIL import Image
+
+from lesion_detector import find_lesion_points, load_leaf_image
+
+
+def legacy_find_lesion_points(img_np):
+    """Original nested-loop scan from detect_lesions (kept here for comparison only)."""
+    h, w, _ = img_np.shape
+    step = max(h, w) // 50
+    detected_points = []
+
+    for y in range(0, h, step):
+        for x in range(0, w, step):
+            r, g, b = (int(v) for v in img_np[y, x])
+            if (r > 80 and g > 60 and r > g - 20 and b < 150):
+                if not (g > r + 30 and g > b + 30):
+                    detected_points.append((x, y))
+
+    if not detected_points:
+        for y in range(0, h, step):
+            for x in range(0, w, step):
+                r, g, b = (int(v) for v in img_np[y, x])
+                if r < 100 and g < 100 and b < 100 and abs(r - g) < 20:
+                    detected_points.append((x, y))
+
+    return detected_points
+
+
+def synthetic_leaf(width, height, spots, seed=0, dark=False):
+    """Green leaf with noisy brown (or dark) lesions."""
+    rng = np.random.default_rng(seed)
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    img[..., 0] = rng.integers(20, 60, (height, width), dtype=np.uint8)
+    img[..., 1] = rng.integers(130, 200, (height, width), dtype=np.uint8)
+    img[..., 2] = rng.integers(20, 60, (height, width), dtype=np.uint8)
+    color = (50, 45, 40) if dark else (150, 100, 40)
+    for _ in range(spots):
+        cy, cx = rng.integers(0, height), rng.integers(0, width)
+        rad = int(rng.integers(max(height, width) // 80, max(height, width) // 25))
+        img[max(0, cy - rad):cy + rad, max(0, cx - rad):cx + rad] = color
+    return img
+
+
+def time_it(fn, arg, runs):
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def full_decode(image_bytes):
+    """Original ingestion: decode every pixel, then convert."""
+    return np.array(Image.open(io.BytesIO(image_bytes)).convert('RGB'))
+
+
+def _peak_rss_child(decoder, image_bytes, conn):
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    decoder(image_bytes)
+    conn.send(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before)
+
+
+def peak_rss_mb(decoder, image_bytes):
+    """Peak RSS growth of one decode, measured in a fresh process."""
+    parent, child = multiprocessing.Pipe()
+    proc = multiprocessing.Process(target=_peak_rss_child, args=(decoder, image_bytes, child))
+    proc.start()
+    grown_kb = parent.recv()
+    proc.join()
+    return grown_kb / 1024
+
+
+def bench_decode(runs):
+    buf = io.BytesIO()
+    Image.fromarray(synthetic_leaf(4000, 3000, 12)).save(buf, 'JPEG', quality=90)
+    jpeg = buf.getvalue()
+
+    print(f"\n📥 12 MP JPEG upload ({len(jpeg) // 1024} KB)")
+    for name, decoder in (("Full decode", full_decode), ("Draft decode", load_leaf_image)):
+        ms = time_it(decoder, jpeg, runs)
+        shape = decoder(jpeg).shape
+        print(f"   {name:13s} {ms:8.1f} ms  {shape[1]}x{shape[0]} px  "
+              f"peak RSS +{peak_rss_mb(decoder, jpeg):.1f} MB")
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    cases = [
+        ("12 MP brown spots", synthetic_leaf(4000, 3000, 12)),
+        ("12 MP dark spots (fallback pass)", synthetic_leaf(4000, 3000, 12, seed=1, dark=True)),
+        ("2 MP brown spots", synthetic_leaf(1600, 1200, 8, seed=2)),
+    ]
+
+    print("\n" + "=" * 60)
+    print("🧪 LESION DETECTOR BENCHMARK (best of %d runs)" % runs)
+    print("=" * 60)
+
+    for name, img in cases:
+        same = legacy_find_lesion_points(img) == find_lesion_points(img)
+        legacy_ms = time_it(legacy_find_lesion_points, img, runs)
+        fast_ms = time_it(find_lesion_points, img, runs)
+        print(f"\n📷 {name}")
+        print(f"   Loop:       {legacy_ms:8.3f} ms")
+        print(f"   Vectorized: {fast_ms:8.3f} ms  ({legacy_ms / fast_ms:.1f}x faster)")
+        print(f"   Same points: {'✅' if same else '❌'}")
+
+    bench_decode(max(1, runs // 4))
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    main()
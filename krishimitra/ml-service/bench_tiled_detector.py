@@ -0,0 +1,77 @@
+"""
+KrishiMitra Tiled Lesion Detector Benchmark
+Runs detect_lesions_tiled on synthetic 12 MP and 50 MP frames and compares
+its time and peak memory with decoding the whole frame into one array
+Usage: python bench_tiled_detector.py
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import resource
+import multiprocessing
+import numpy as np
+from PIL import Image
+
+from bench_lesion_detector import synthetic_leaf
+from lesion_detector import detect_lesions_tiled, find_lesion_mask, label_clusters
+
+
+def whole_frame(path):
+    """Naive approach: np.array(img) on the full frame, then scan."""
+    img_np = np.array(Image.open(path).convert('RGB'))
+    mask, _ = find_lesion_mask(img_np, grid=400)
+    return label_clusters(mask)
+
+
+def _run_child(fn, path, conn):
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    fn(path)
+    elapsed = time.perf_counter() - start
+    conn.send((elapsed * 1000, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) / 1024))
+
+
+def measure(fn, path):
+    """(ms, peak RSS growth in MB) of one call, in a fresh process."""
+    parent, child = multiprocessing.Pipe()
+    proc = multiprocessing.Process(target=_run_child, args=(fn, path, child))
+    proc.start()
+    result = parent.recv()
+    proc.join()
+    return result
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="krishimitra_bench_")
+    print("\n" + "=" * 60)
+    print("🧪 TILED LESION DETECTOR BENCHMARK")
+    print("=" * 60)
+
+    try:
+        for label, (width, height) in (("12 MP", (4000, 3000)), ("50 MP", (8660, 5774))):
+            frame = synthetic_leaf(width, height, 40, seed=7)
+            ppm = os.path.join(workdir, f"frame_{label[:2]}.ppm")
+            jpg = os.path.join(workdir, f"frame_{label[:2]}.jpg")
+            Image.fromarray(frame).save(ppm)
+            Image.fromarray(frame).save(jpg, quality=90)
+            del frame
+
+            print(f"\n🛰️  Synthetic {label} frame ({width}x{height})")
+            for name, fn, path in (
+                ("Whole frame (PPM)", whole_frame, ppm),
+                ("Tiled, mmap (PPM)", detect_lesions_tiled, ppm),
+                ("Whole frame (JPEG)", whole_frame, jpg),
+                ("Tiled, draft (JPEG)", detect_lesions_tiled, jpg),
+            ):
+                ms, mb = measure(fn, path)
+                print(f"   {name:20s} {ms:9.1f} ms   peak RSS +{mb:7.1f} MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import threading
+
+import numpy as np
+
+# Pivots allowed before giving up (a 3-nutrient problem needs a handful)
+MAX_PIVOTS = 50
+EPS = 1e-9
+
+
+def min_cost_blend(needs, npk, prices):
+    """Cheapest product quantities (kg) that supply at least `needs` kg of N, P, K.
+
+    needs:  (3,) kg of N, P, K to supply
+    npk:    (m, 3) nutrient percentages of each product
+    prices: (m,) price per kg
+
+    Solves  min prices.x  s.t.  (npk/100)^T x >= needs, x >= 0  with a dual
+    simplex on a 3-row tableau. The all-surplus starting basis is already
+    dual feasible (prices are non-negative), so there is no phase 1, and
+    each pivot is one NumPy row operation over the m + 3 columns.
+
+    Returns (x, shortfall): x is (m,) kg; shortfall is (3,) kg of need that
+    no product in the table can supply (e.g. K with only N/P products).
+    """
+    needs = np.maximum(np.asarray(needs, dtype=float), 0.0)
+    content = np.asarray(npk, dtype=float) / 100.0
+    prices = np.asarray(prices, dtype=float)
+    m = len(prices)
+
+    # A nutrient no product contains can't be met; report it instead of failing
+    suppliable = content.sum(axis=0) > EPS if m else np.zeros(3, dtype=bool)
+    shortfall = np.where(suppliable, 0.0, needs)
+    b = np.where(suppliable, needs, 0.0)
+    if m == 0 or not b.any():
+        return np.zeros(m), shortfall
+
+    # Rows: -A^T x + s = -b, basis = surplus columns s (values -b, infeasible)
+    tableau = np.hstack([-content.T, np.eye(3), -b[:, None]])
+    costs = np.concatenate([prices, np.zeros(3)])
+    basis = np.arange(m, m + 3)
+
+    for _ in range(MAX_PIVOTS):
+        rhs = tableau[:, -1]
+        row = int(np.argmin(rhs))
+        if rhs[row] >= -EPS:
+            break
+        entries = tableau[row, :-1]
+        reduced = costs - costs[basis] @ tableau[:, :-1]
+        candidates = entries < -EPS
+        if not candidates.any():
+            # Can't happen for suppliable nutrients; guard against rounding
+            break
+        ratios = np.full(len(entries), np.inf)
+        ratios[candidates] = reduced[candidates] / -entries[candidates]
+        col = int(np.argmin(ratios))
+        tableau[row] /= tableau[row, col]
+        others = np.arange(3) != row
+        tableau[others] -= np.outer(tableau[others, col], tableau[row])
+        basis[row] = col
+
+    x = np.zeros(m + 3)
+    x[basis] = np.maximum(tableau[:, -1], 0.0)
+    return x[:m], shortfall
+
+
+def budget_blend(needs, npk, prices, budget=None):
+    """min_cost_blend, scaled down to fit `budget` when it costs more.
+
+    Scaling the cheapest full blend by budget / cost is optimal under a
+    budget: the cheapest way to supply a fraction t of every need costs t
+    times the full minimum, so it gives the largest equal share of all
+    three nutrients the money can buy.
+
+    Returns (x, coverage): coverage is the fraction (0-1) of each
+    nutrient's need supplied, (3,).
+    """
+    x, shortfall = min_cost_blend(needs, npk, prices)
+    cost = float(np.dot(prices, x)) if len(x) else 0.0
+    if budget and budget > 0 and cost > budget:
+        x = x * (budget / cost)
+    needs = np.maximum(np.asarray(needs, dtype=float), 0.0)
+    supplied = (np.asarray(npk, dtype=float) / 100.0).T @ x if len(x) else np.zeros(3)
+    coverage = np.where(needs > EPS, np.minimum(supplied / np.where(needs > EPS, needs, 1.0), 1.0), 1.0)
+    return x, coverage
+
+
+# Batch solving enumerates vertex bases, C(products + 3, 3) of them, so it
+# suits small product tables (9 products -> 220 bases); past MAX_BATCH_BASES
+# it solves farm by farm with min_cost_blend instead
+BATCH_CHUNK_FARMS = 4096
+MAX_BATCH_BASES = 20000
+_bases_cache = {}
+# Request threads share the cache; the bases themselves are built outside the lock
+_bases_lock = threading.Lock()
+
+
+def _vertex_bases(content):
+    """(columns (B, 3), inverses (B, 3, 3)) of every non-singular 3-column basis
+    of [A^T | -I], cached per product table."""
+    key = (content.shape, content.tobytes())
+    with _bases_lock:
+        cached = _bases_cache.get(key)
+    if cached is None:
+        m = len(content)
+        matrix = np.hstack([content.T, -np.eye(3)])
+        columns = np.array([(i, j, k) for i in range(m + 3) for j in range(i + 1, m + 3)
+                            for k in range(j + 1, m + 3)], dtype=int).reshape(-1, 3)
+        blocks = matrix[:, columns].transpose(1, 0, 2)
+        keep = np.abs(np.linalg.det(blocks)) > EPS
+        cached = (columns[keep], np.linalg.inv(blocks[keep]))
+        with _bases_lock:
+            if key not in _bases_cache and len(_bases_cache) >= 8:
+                # Product tables change with knowledge base reloads; keep the latest few
+                _bases_cache.pop(next(iter(_bases_cache)))
+            _bases_cache[key] = cached
+    return cached
+
+
+def batch_min_cost_blend(needs, npk, prices):
+    """min_cost_blend for many farms at once.
+
+    needs: (F, 3) kg of N, P, K per farm. Every vertex of the feasible region
+    is some basis's inverse times the needs, so all farms x all bases are
+    solved with one broadcast product and the cheapest non-negative vertex
+    wins per farm (the LP optimum is always at a vertex).
+
+    Returns (x (F, m), shortfall (F, 3)).
+    """
+    needs = np.maximum(np.asarray(needs, dtype=float).reshape(-1, 3), 0.0)
+    content = np.asarray(npk, dtype=float).reshape(-1, 3) / 100.0
+    prices = np.asarray(prices, dtype=float)
+    m = len(prices)
+    farms = len(needs)
+
+    suppliable = content.sum(axis=0) > EPS if m else np.zeros(3, dtype=bool)
+    shortfall = np.where(suppliable, 0.0, needs)
+    b = np.where(suppliable, needs, 0.0)
+    x = np.zeros((farms, m))
+    if m == 0 or farms == 0:
+        return x, shortfall
+    if (m + 3) * (m + 2) * (m + 1) // 6 > MAX_BATCH_BASES:
+        for i in range(farms):
+            x[i] = min_cost_blend(b[i], npk, prices)[0]
+        return x, shortfall
+
+    columns, inverses = _vertex_bases(content)
+    basis_costs = np.concatenate([prices, np.zeros(3)])[columns]
+    for start in range(0, farms, BATCH_CHUNK_FARMS):
+        chunk = b[start:start + BATCH_CHUNK_FARMS]
+        values = np.einsum('bij,fj->fbi', inverses, chunk)
+        costs = np.einsum('fbi,bi->fb', values, basis_costs)
+        costs[(values < -EPS * (1.0 + chunk.max(axis=1)[:, None, None])).any(axis=2)] = np.inf
+        best = np.argmin(costs, axis=1)
+        rows = np.arange(len(chunk))
+        chosen = columns[best]
+        amounts = np.maximum(values[rows, best], 0.0)
+        padded = np.zeros((len(chunk), m + 3))
+        np.put_along_axis(padded, chosen, amounts, axis=1)
+        x[start:start + len(chunk)] = padded[:, :m]
+    return x, shortfall
+
+
+def batch_budget_blend(needs, npk, prices, budgets=None):
+    """budget_blend for many farms: budgets is a scalar, (F,) array or None.
+
+    Returns (x (F, m), coverage (F, 3)).
+    """
+    x, _ = batch_min_cost_blend(needs, npk, prices)
+    prices = np.asarray(prices, dtype=float)
+    if budgets is not None:
+        cost = x @ prices
+        budgets = np.broadcast_to(np.asarray(budgets, dtype=float), cost.shape)
+        over = (budgets > 0) & (cost > budgets)
+        x[over] *= (budgets[over] / cost[over])[:, None]
+    needs = np.maximum(np.asarray(needs, dtype=float).reshape(-1, 3), 0.0)
+    supplied = x @ (np.asarray(npk, dtype=float).reshape(-1, 3) / 100.0)
+    coverage = np.where(needs > EPS, np.minimum(supplied / np.where(needs > EPS, needs, 1.0), 1.0), 1.0)
+    return x, coverage
@@ -0,0 +1,306 @@
+import os
+import re
+import json
+import time
+import threading
+import unicodedata
+
+import numpy as np
+
+from response_cache import ResponseCache, make_key
+from text_utils import normalize_question
+
+CHAT_CACHE_MAX_BYTES = int(os.environ.get('CHAT_CACHE_MAX_BYTES', 4 * 1024 * 1024))
+CHAT_CACHE_TTL = int(os.environ.get('CHAT_CACHE_TTL', 24 * 3600))
+CHAT_CACHE_PATH = os.environ.get('CHAT_CACHE_PATH')
+
+
+class ChatCache:
+    """LLM answers keyed by (language, normalized question).
+
+    Backed by a ResponseCache, so it is LRU + TTL bounded in memory and, with
+    CHAT_CACHE_PATH set, shares a SQLite tier with every gunicorn worker.
+    Each entry remembers how long the provider took, so hits can report the
+    latency they saved.
+    """
+
+    def __init__(self, max_bytes=CHAT_CACHE_MAX_BYTES, ttl=CHAT_CACHE_TTL, disk_path=CHAT_CACHE_PATH):
+        self.store = ResponseCache(max_bytes, ttl, disk_path=disk_path)
+        self._lock = threading.Lock()
+        self.saved_ms = 0.0
+
+    def key(self, language, question):
+        return make_key('chat', language, normalize_question(question))
+
+    def get(self, language, question):
+        raw = self.store.get(self.key(language, question))
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        with self._lock:
+            self.saved_ms += entry["ms"]
+        return entry["answer"]
+
+    def put(self, language, question, answer, latency_ms):
+        raw = json.dumps({"answer": answer, "ms": round(latency_ms, 1)}, ensure_ascii=False)
+        self.store.put(self.key(language, question), raw.encode('utf-8'))
+
+    def stats(self):
+        data = self.store.stats()
+        with self._lock:
+            data["saved_provider_ms"] = round(self.saved_ms, 1)
+        return data
+
+
+# Semantic near-duplicate layer: hashed char n-gram + word TF-IDF, cosine match per language.
+# The threshold is calibrated on the labelled pairs in test_semantic_cache.py
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get('SEMANTIC_CACHE_THRESHOLD', 0.85))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get('SEMANTIC_CACHE_MAX_ENTRIES', 500))
+SEMANTIC_CACHE_FEATURES = int(os.environ.get('SEMANTIC_CACHE_FEATURES', 4096))
+# Weight of the word block against the char n-gram block (each is unit length)
+SEMANTIC_WORD_WEIGHT = 2.0
+
+# Words that carry no topic ("how do I ..."), and question words folded into the noun they ask about
+STOP_WORDS = frozenset(
+    'a an the i do does did is are am be to of for in on at my me we what which how should can will '
+    'it this that with and or please tell about'.split()
+    + 'की का के में है हैं को से कौन सा सी क्या करें करे कैसे लिए और'.split()
+)
+QUESTION_WORDS = {'when': 'time', 'कब': 'समय'}
+
+# Quantities must match exactly: "urea for 5 acre" is not "urea for 1 acre"
+NUMBER = re.compile(r'\d+(?:\.\d+)?')
+NUMBER_WORDS = {
+    'one': 1.0, 'two': 2.0, 'three': 3.0, 'four': 4.0, 'five': 5.0,
+    'six': 6.0, 'seven': 7.0, 'eight': 8.0, 'nine': 9.0, 'ten': 10.0, 'half': 0.5,
+    'एक': 1.0, 'दो': 2.0, 'तीन': 3.0, 'चार': 4.0, 'पांच': 5.0, 'पाँच': 5.0,
+    'छह': 6.0, 'सात': 7.0, 'आठ': 8.0, 'नौ': 9.0, 'दस': 10.0, 'आधा': 0.5
+}
+UNITS = {
+    'acre': 'acre', 'acres': 'acre', 'एकड़': 'acre',
+    'hectare': 'hectare', 'hectares': 'hectare', 'ha': 'hectare', 'हेक्टेयर': 'hectare',
+    'bigha': 'bigha', 'bighas': 'bigha', 'बीघा': 'bigha',
+    'kg': 'kg', 'kgs': 'kg', 'kilo': 'kg', 'kilos': 'kg', 'kilogram': 'kg', 'kilograms': 'kg', 'किलो': 'kg',
+    'g': 'g', 'gm': 'g', 'gram': 'g', 'grams': 'g', 'ग्राम': 'g',
+    'quintal': 'quintal', 'quintals': 'quintal', 'क्विंटल': 'quintal',
+    'ton': 'ton', 'tons': 'ton', 'tonne': 'ton', 'tonnes': 'ton', 'टन': 'ton',
+    'l': 'litre', 'litre': 'litre', 'litres': 'litre', 'liter': 'litre', 'liters': 'litre', 'लीटर': 'litre',
+    'ml': 'ml', 'मिली': 'ml', 'bag': 'bag', 'bags': 'bag', 'बोरी': 'bag',
+    'day': 'day', 'days': 'day', 'दिन': 'day', 'week': 'week', 'weeks': 'week', 'हफ्ते': 'week',
+    '%': 'percent', 'percent': 'percent', 'प्रतिशत': 'percent'
+}
+
+
+def _stem(word):
+    """Crude English stemmer: sowing -> sow, aphids -> aphid, tomatoes -> tomato."""
+    if word.endswith('ing') and len(word) >= 6:
+        return word[:-3]
+    if word.endswith('ed') and len(word) >= 5:
+        return word[:-2]
+    if word.endswith('es') and len(word) >= 5 and word[-3] in 'sxzho':
+        return word[:-2]
+    if word.endswith('s') and not word.endswith('ss') and len(word) >= 4:
+        return word[:-1]
+    return word
+
+
+def question_words(question):
+    """Topic words of a question: stop words dropped, English endings stripped."""
+    words = []
+    for word in normalize_question(question).split():
+        word = QUESTION_WORDS.get(word, word)
+        if word not in STOP_WORDS:
+            words.append(_stem(word))
+    return words
+
+
+def question_quantities(question):
+    """(numbers, units) named in a question, in any script's digits, sorted."""
+    text = unicodedata.normalize('NFC', question).casefold()
+    text = re.sub(r'(?<=\d),(?=\d{3})', '', text)
+    numbers = [float(n) for n in NUMBER.findall(text)]
+    # '%' is punctuation to normalize_question, so spell it out first
+    words = normalize_question(NUMBER.sub(' ', text).replace('%', ' percent ')).split()
+    numbers += [NUMBER_WORDS[w] for w in words if w in NUMBER_WORDS]
+    units = {UNITS[w] for w in words if w in UNITS}
+    return tuple(sorted(numbers)), tuple(sorted(units))
+
+
+class _LanguageIndex:
+    """Term-frequency rows for one language plus the document frequencies behind the IDF.
+
+    Rows hold hashed n-gram and word counts, and IDF weighting is applied at
+    query time. That way inserts and evictions only touch one row and the df
+    vector, and similarities always use the current IDF. Each row also keeps
+    a hash of the question's numbers and units, which a match must share.
+    """
+
+    def __init__(self, features, max_entries):
+        self.max_entries = max_entries
+        self.tf = np.zeros((min(16, max_entries), features), dtype=np.float32)
+        self.df = np.zeros(features, dtype=np.float32)
+        self.answers = []
+        self.quantities = np.zeros(len(self.tf), dtype=np.int64)
+        self.expires = np.zeros(len(self.tf))
+        self.used = np.zeros(len(self.tf))
+        self.latency_ms = np.zeros(len(self.tf))
+        self._weights = None  # (idf^2, weighted row norms), rebuilt after an insert
+
+    def idf(self):
+        n = len(self.answers)
+        return np.log((1.0 + n) / (1.0 + self.df)) + 1.0
+
+    def search(self, tf, quantities, now):
+        """(row, cosine) of the closest live entry with the same quantities, or (None, 0.0)."""
+        n = len(self.answers)
+        if n == 0:
+            return None, 0.0
+        rows = self.tf[:n]
+        if self._weights is None:
+            weights = self.idf() ** 2
+            self._weights = weights, np.sqrt((rows * rows) @ weights)
+        weights, row_norms = self._weights
+        query_norm = np.sqrt(np.dot(tf * tf, weights))
+        sims = (rows @ (tf * weights)) / np.maximum(row_norms * query_norm, 1e-12)
+        sims[(self.expires[:n] < now) | (self.quantities[:n] != quantities)] = -1.0
+        best = int(np.argmax(sims))
+        return best, float(sims[best])
+
+    def insert(self, tf, quantities, answer, expires, latency_ms, now, row=None):
+        n = len(self.answers)
+        if row is not None:
+            # Same question again (e.g. after it expired): refresh its row
+            self.df -= self.tf[row] > 0
+            self.answers[row] = answer
+        elif n < self.max_entries:
+            if n == len(self.tf):
+                grow = min(self.max_entries, 2 * n) - n
+                self.tf = np.vstack([self.tf, np.zeros((grow, self.tf.shape[1]), dtype=np.float32)])
+                self.quantities = np.concatenate([self.quantities, np.zeros(grow, dtype=np.int64)])
+                self.expires = np.concatenate([self.expires, np.zeros(grow)])
+                self.used = np.concatenate([self.used, np.zeros(grow)])
+                self.latency_ms = np.concatenate([self.latency_ms, np.zeros(grow)])
+            row = n
+            self.answers.append(answer)
+        else:
+            # Full: reuse the least recently used row
+            row = int(np.argmin(self.used[:n]))
+            self.df -= self.tf[row] > 0
+            self.answers[row] = answer
+        self.tf[row] = tf
+        self.quantities[row] = quantities
+        self.df += tf > 0
+        self.expires[row] = expires
+        self.used[row] = now
+        self.latency_ms[row] = latency_ms
+        self._weights = None
+
+
+class SemanticCache:
+    """Answers for paraphrased questions ("wheat sowing time" / "when do I sow wheat").
+
+    Questions are embedded locally (no network) as hashed TF-IDF vectors,
+    character n-grams alongside topic words (question_words), and kept in
+    one NumPy matrix per language. A lookup is a single matrix-vector
+    product; a hit needs cosine similarity of at least `threshold` and the
+    same numbers and units (question_quantities). Each language keeps at
+    most `max_entries` rows and evicts the least recently used one.
+    """
+
+    def __init__(self, threshold=SEMANTIC_CACHE_THRESHOLD, max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+                 features=SEMANTIC_CACHE_FEATURES, ttl=CHAT_CACHE_TTL):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.features = features
+        # Words are far fewer than char n-grams, so they get a smaller hash space
+        self.word_features = max(features // 4, 1)
+        self.ttl = ttl
+        self.enabled = max_entries > 0
+        self._vectorizers = None
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+
+    def _embed(self, question):
+        """Term-frequency vector of `question`, or None when scikit-learn is missing.
+
+        The char n-gram block and the word block are each scaled to unit
+        length, the word block then weighted by SEMANTIC_WORD_WEIGHT.
+        """
+        if self._vectorizers is None:
+            # scikit-learn is imported on first use; it is too slow to import at startup
+            try:
+                from sklearn.feature_extraction.text import HashingVectorizer
+            except ImportError:
+                print("⚠️ scikit-learn not available. Semantic chat cache disabled.")
+                self.enabled = False
+                return None
+            self._vectorizers = (
+                HashingVectorizer(analyzer='char_wb', ngram_range=(2, 4), n_features=self.features,
+                                  alternate_sign=False, norm='l2', preprocessor=normalize_question),
+                HashingVectorizer(analyzer=question_words, n_features=self.word_features,
+                                  alternate_sign=False, norm='l2')
+            )
+        chars, words = (v.transform([question]).toarray()[0] for v in self._vectorizers)
+        return np.concatenate([chars, SEMANTIC_WORD_WEIGHT * words]).astype(np.float32)
+
+    def _query(self, question):
+        """(tf, quantities hash) of a question, or None when it can't be embedded."""
+        tf = self._embed(question)
+        return None if tf is None else (tf, hash(question_quantities(question)))
+
+    def nearest(self, language, question):
+        """(answer, cosine) of the closest cached question, ignoring the threshold and stats."""
+        query = self._query(question) if self.enabled else None
+        if query is None:
+            return None, 0.0
+        with self._lock:
+            index = self._indexes.get(language)
+            row, similarity = index.search(*query, time.time()) if index else (None, 0.0)
+            return (None, 0.0) if row is None else (index.answers[row], similarity)
+
+    def get(self, language, question):
+        query = self._query(question) if self.enabled else None
+        if query is None:
+            return None
+        now = time.time()
+        with self._lock:
+            index = self._indexes.get(language)
+            row, similarity = index.search(*query, now) if index else (None, 0.0)
+            if row is None or similarity < self.threshold:
+                self.misses += 1
+                return None
+            index.used[row] = now
+            self.hits += 1
+            self.saved_ms += float(index.latency_ms[row])
+            return index.answers[row]
+
+    def put(self, language, question, answer, latency_ms):
+        if not self.enabled:
+            return
+        query = self._query(question)
+        if query is None:
+            return
+        now = time.time()
+        with self._lock:
+            index = self._indexes.get(language)
+            if index is None:
+                index = self._indexes[language] = _LanguageIndex(self.features + self.word_features, self.max_entries)
+            row, similarity = index.search(*query, float('-inf'))
+            index.insert(*query, answer, now + self.ttl, latency_ms, now, row if similarity > 0.999 else None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "threshold": self.threshold,
+                "entries": {lang: len(index.answers) for lang, index in self._indexes.items()},
+                "max_entries_per_language": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "saved_provider_ms": round(self.saved_ms, 1)
+            }
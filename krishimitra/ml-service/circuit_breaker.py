@@ -0,0 +1,133 @@
+import os
+import time
+import threading
+from collections import deque
+
+BREAKER_WINDOW = int(os.environ.get('BREAKER_WINDOW', 20))
+BREAKER_MIN_CALLS = int(os.environ.get('BREAKER_MIN_CALLS', 5))
+BREAKER_ERROR_RATE = float(os.environ.get('BREAKER_ERROR_RATE', 0.5))
+BREAKER_SLOW_CALL_SECONDS = float(os.environ.get('BREAKER_SLOW_CALL_SECONDS', 10))
+BREAKER_OPEN_SECONDS = float(os.environ.get('BREAKER_OPEN_SECONDS', 30))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Rolling error-rate breaker for one upstream provider.
+
+    The last `window` calls are kept; a call counts as bad if it raised,
+    returned nothing, or took longer than `slow_call_seconds`. Once at least
+    `min_calls` are recorded and the bad share reaches `error_rate`, the
+    breaker opens and callers skip the provider. After `open_seconds` a
+    single probe call is let through (half-open): success closes the
+    breaker, failure opens it for another `open_seconds`.
+    """
+
+    def __init__(self, name, window=BREAKER_WINDOW, min_calls=BREAKER_MIN_CALLS,
+                 error_rate=BREAKER_ERROR_RATE, slow_call_seconds=BREAKER_SLOW_CALL_SECONDS,
+                 open_seconds=BREAKER_OPEN_SECONDS):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._calls = deque(maxlen=window)  # (ok, latency seconds)
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.trips = 0
+        self.rejected = 0
+        self.last_error = None
+
+    def _cooled_down(self):
+        return time.time() - self._opened_at >= self.open_seconds
+
+    def available(self):
+        """Would a call be let through right now? Does not claim the half-open probe."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return self._cooled_down()
+            return not self._probing
+
+    def allow(self):
+        """Claim permission for one call (the probe, when half-open)."""
+        with self._lock:
+            if self.state == OPEN and self._cooled_down():
+                self.state = HALF_OPEN
+                self._probing = False
+                print(f"🔌 {self.name} circuit half-open, probing")
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, ok, latency, error=None):
+        if latency > self.slow_call_seconds:
+            ok = False
+            error = error or f"slow call ({latency:.1f}s)"
+        with self._lock:
+            if not ok:
+                self.last_error = str(error) if error else "empty response"
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if ok:
+                    self.state = CLOSED
+                    self._calls.clear()
+                    print(f"✅ {self.name} circuit closed")
+                else:
+                    self._trip()
+                return
+            self._calls.append((ok, latency))
+            if self.state == CLOSED and len(self._calls) >= self.min_calls:
+                bad = sum(1 for ok, _ in self._calls if not ok)
+                if bad / len(self._calls) >= self.error_rate:
+                    self._trip()
+
+    def _trip(self):
+        self.state = OPEN
+        self._opened_at = time.time()
+        self.trips += 1
+        print(f"⛔ {self.name} circuit open for {self.open_seconds:.0f}s: {self.last_error}")
+
+    def call(self, fn, *args):
+        """Run fn(*args) through the breaker; raises CircuitOpen when skipped."""
+        if not self.allow():
+            raise CircuitOpen(f"{self.name} circuit open")
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception as e:
+            self.record(False, time.perf_counter() - start, e)
+            raise
+        self.record(bool(result), time.perf_counter() - start)
+        return result
+
+    def stats(self):
+        with self._lock:
+            calls = list(self._calls)
+            state = self.state
+            if state == OPEN and self._cooled_down():
+                state = HALF_OPEN
+            latencies = sorted(latency for _, latency in calls)
+            return {
+                "state": state,
+                "calls": len(calls),
+                "error_rate": round(sum(1 for ok, _ in calls if not ok) / len(calls), 3) if calls else 0.0,
+                "latency_p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                "latency_max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "last_error": self.last_error
+            }
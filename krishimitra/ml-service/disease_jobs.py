@@ -0,0 +1,209 @@
+import json
+import time
+import uuid
+import queue
+import socket
+import sqlite3
+import threading
+import ipaddress
+from urllib.parse import urlsplit
+
+
+class QueueFull(Exception):
+    pass
+
+
+def check_callback_url(url, hosts=None):
+    """Raise ValueError unless `url` is an http(s) URL whose host may be called back.
+
+    With `hosts`, the host name must be one of them. Either way every address
+    it resolves to must be public: private, loopback, link-local, reserved and
+    multicast addresses are refused, so callbacks can't reach internal services.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError("callback_url must be an http(s) URL")
+    host = parts.hostname.lower()
+    if hosts and host not in hosts:
+        raise ValueError(f"callback_url host {host} is not allowed")
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)}
+    except (OSError, ValueError) as e:
+        raise ValueError(f"callback_url host {host} can't be resolved: {e}")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split('%')[0])
+        if getattr(ip, 'ipv4_mapped', None):
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"callback_url host {host} resolves to a non-public address")
+
+
+class JobQueue:
+    """Bounded in-process job queue with SQLite-backed job state.
+
+    `handler(payload)` runs on a small pool of worker threads and returns the
+    serialized result (bytes). Job state lives in SQLite: in memory by
+    default, or in a file shared by every gunicorn worker so a client can
+    poll whichever worker it lands on. When `max_pending` jobs are waiting,
+    submit() raises QueueFull instead of letting requests pile up.
+    Callback URLs are checked with check_callback_url against
+    `callback_hosts` (any public host when empty). `error_statuses` maps
+    exception types that mean bad input (not a server fault) to the HTTP
+    status a failed job is polled with; anything else is a 500.
+    """
+
+    def __init__(self, handler, workers=2, max_pending=32, db_path=':memory:', ttl=3600,
+                 callback_hosts=None, error_statuses=None):
+        self.handler = handler
+        self.error_statuses = tuple((error_statuses or {}).items())
+        self.callback_hosts = {h.strip().lower() for h in callback_hosts or () if h.strip()}
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+        if db_path != ':memory:':
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT, result BLOB, error TEXT, "
+            "callback_url TEXT, created REAL, finished REAL, error_status INTEGER)"
+        )
+        # Job files created before error_status existed
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if 'error_status' not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN error_status INTEGER")
+        self._db.commit()
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _start_workers(self):
+        # Threads start on first use, after gunicorn has forked the worker
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._work, name=f"disease-job-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _execute(self, sql, params=()):
+        with self._db_lock:
+            rows = self._db.execute(sql, params).fetchall()
+            self._db.commit()
+            return rows
+
+    def check_callback(self, callback_url):
+        """Raise ValueError if this queue must not call `callback_url` back."""
+        check_callback_url(callback_url, self.callback_hosts)
+
+    def submit(self, payload, callback_url=None):
+        """Queue a job and return its id, or raise QueueFull."""
+        self._start_workers()
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._execute("DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?", (now - self.ttl,))
+        self._execute(
+            "INSERT INTO jobs (id, status, callback_url, created) VALUES (?, 'queued', ?, ?)",
+            (job_id, callback_url, now)
+        )
+        try:
+            self._queue.put_nowait((job_id, payload, callback_url))
+        except queue.Full:
+            self._execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self.rejected += 1
+            raise QueueFull()
+        return job_id
+
+    def add_done(self, result, callback_url=None):
+        """Record an already-finished job (e.g. a cache hit) so clients poll it like any other."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, status, result, callback_url, created, finished) VALUES (?, 'done', ?, ?, ?, ?)",
+            (job_id, sqlite3.Binary(result), callback_url, now, now)
+        )
+        if callback_url:
+            threading.Thread(target=self._notify, args=(job_id, callback_url, 'done', result), daemon=True).start()
+        return job_id
+
+    def get(self, job_id):
+        """(status, result bytes or None, error or None, HTTP status of the error or None),
+        or None for an unknown id."""
+        rows = self._execute("SELECT status, result, error, error_status FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        status, result, error, error_status = rows[0]
+        return status, bytes(result) if result is not None else None, error, error_status
+
+    def _error_status(self, error):
+        for kind, http_status in self.error_statuses:
+            if isinstance(error, kind):
+                return http_status
+        return 500
+
+    def _work(self):
+        while True:
+            job_id, payload, callback_url = self._queue.get()
+            try:
+                self._execute("UPDATE jobs SET status = 'running' WHERE id = ?", (job_id,))
+                result = self.handler(payload)
+                self._execute(
+                    "UPDATE jobs SET status = 'done', result = ?, finished = ? WHERE id = ?",
+                    (sqlite3.Binary(result), time.time(), job_id)
+                )
+                self.completed += 1
+                if callback_url:
+                    self._notify(job_id, callback_url, 'done', result=result)
+            except Exception as e:
+                print(f"Disease Job Error: {e}")
+                self.failed += 1
+                self._execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, error_status = ?, finished = ? WHERE id = ?",
+                    (str(e), self._error_status(e), time.time(), job_id)
+                )
+                # Callback clients never poll, so they must hear about failures too
+                if callback_url:
+                    self._notify(job_id, callback_url, 'failed', error=str(e))
+            finally:
+                self._queue.task_done()
+
+    def _notify(self, job_id, callback_url, status, result=None, error=None):
+        """POST {"job_id", "status", "result"} (done) or {"job_id", "status", "error"} (failed)."""
+        if result is not None:
+            # Splice the stored report in as-is instead of parsing it again
+            body = (b'{"job_id":' + json.dumps(job_id).encode() + b',"status":' + json.dumps(status).encode()
+                    + b',"result":' + result + b'}')
+        else:
+            body = json.dumps({"job_id": job_id, "status": status, "error": error}).encode()
+        try:
+            # Checked again here: the host's DNS may have changed since submit
+            self.check_callback(callback_url)
+            import requests
+            requests.post(
+                callback_url,
+                data=body,
+                headers={"Content-Type": "application/json"},
+                timeout=10,
+                # A redirect could point anywhere, including internal addresses
+                allow_redirects=False
+            )
+        except Exception as e:
+            print(f"Job Callback Error ({callback_url}): {e}")
+
+    def stats(self):
+        counts = dict(self._execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        return {
+            "workers": self.workers,
+            "pending": self._queue.qsize(),
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "jobs": counts
+        }
@@ -0,0 +1,284 @@
+"""
+Fertilizer knowledge base: crop needs, soil profiles and products, loaded
+from JSON files in data/ and reloaded when they change.
+
+    crop_nutrients.json   {"Wheat": {"N": 60, "P": 30, "K": 20, "stages": 3, "aliases": [...]}}
+    soil_profiles.json    {"Black soil": {"N": 0.5, "P": 0.3, "K": 0.7}}
+    fertilizers.json      [{"name": "Urea", "npk": [46, 0, 0], "type": "chemical", "price": 6.5}]
+    district_prices.json  {"Pune": {"Urea": 6.75}}  (optional; overrides the listed price)
+"""
+
+import os
+import json
+import time
+import threading
+
+import numpy as np
+
+from text_utils import normalize_question
+
+KB_DATA_DIR = os.environ.get('KB_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+# Seconds between checks of the data files' modification times
+KB_RELOAD_INTERVAL = float(os.environ.get('KB_RELOAD_INTERVAL', 5))
+
+KB_FILES = ('crop_nutrients.json', 'soil_profiles.json', 'fertilizers.json', 'district_prices.json')
+OPTIONAL_FILES = ('district_prices.json',)
+
+
+def _fold(name):
+    """Case/space folding, enough for most lookups before full normalization."""
+    return ' '.join(name.casefold().split())
+
+
+# Attributes built from one data file, so a reload can reuse them while the file is unchanged
+CROP_ATTRS = ('crop_requirements', 'crop_names', 'crop_ids', 'crop_index', '_crop_scan', '_crop_npk')
+SOIL_ATTRS = ('soil_profiles', 'soil_names', 'soil_index', '_soil_npk')
+PRODUCT_ATTRS = ('fertilizers', 'organic_fertilizers', 'product_names', 'npk_matrix', 'prices', 'organic_mask')
+DISTRICT_ATTRS = ('district_prices', '_district_columns', '_district_source')
+
+
+class KnowledgeBase:
+    """One immutable snapshot of the tables and the indexes built from them.
+
+    Requests take a snapshot once and use it throughout, so a reload swapping
+    in a new one never changes the data under a request halfway through.
+    With `previous` set, the indexes of files not in `changed` are shared
+    with that snapshot instead of rebuilt (their tables may then be None);
+    nothing in a snapshot is ever mutated, so sharing is safe.
+    """
+
+    def __init__(self, crops, soils, fertilizers, district_prices=None, version=1, previous=None, changed=KB_FILES):
+        self.version = version
+
+        def reuse(name, attrs):
+            if previous is None or name in changed:
+                return False
+            for attr in attrs:
+                setattr(self, attr, getattr(previous, attr))
+            return True
+
+        if not reuse('crop_nutrients.json', CROP_ATTRS):
+            self._build_crops(crops)
+        if not reuse('soil_profiles.json', SOIL_ATTRS):
+            self._build_soils(soils)
+        if not reuse('fertilizers.json', PRODUCT_ATTRS):
+            self._build_products(fertilizers)
+        # District columns point into the product table, so a product added,
+        # removed or reordered rebuilds them too (a price edit does not)
+        if previous is not None and previous.product_names != self.product_names:
+            if 'district_prices.json' not in changed:
+                district_prices = previous._district_source
+            self._build_districts(district_prices)
+        elif not reuse('district_prices.json', DISTRICT_ATTRS):
+            self._build_districts(district_prices)
+
+        if previous is not None and self._crop_npk is previous._crop_npk and self._soil_npk is previous._soil_npk:
+            self.needs_table, self.needs_rows = previous.needs_table, previous.needs_rows
+        else:
+            # needs_table[crop, soil]: N/P/K (kg/acre) after the soil's own supply;
+            # the extra last soil column is for unknown soils (no adjustment)
+            self.needs_table = self._crop_npk[:, None, :] * (1 - self._soil_npk[None, :, :])
+            # Plain nested lists for the one-farm path, where indexing beats NumPy scalars
+            self.needs_rows = self.needs_table.tolist()
+
+    def _build_crops(self, crops):
+        self.crop_requirements = {
+            name: {'N': c['N'], 'P': c['P'], 'K': c['K'], 'stages': c.get('stages', 3)}
+            for name, c in crops.items()
+        }
+        # Crop names and aliases -> database key
+        self.crop_names = list(self.crop_requirements)
+        self.crop_ids = {crop: i for i, crop in enumerate(self.crop_names)}
+        self.crop_index = {}
+        for crop in self.crop_names:
+            for name in [crop] + list(crops[crop].get('aliases', ())):
+                self.crop_index[normalize_question(name)] = crop
+        # Substring fallback ("my wheat field"), in database order
+        self._crop_scan = [(normalize_question(crop), crop) for crop in self.crop_names]
+        self._crop_npk = np.array([[self.crop_requirements[c][k] for k in 'NPK'] for c in self.crop_names],
+                                  dtype=float).reshape(-1, 3)
+
+    def _build_soils(self, soils):
+        self.soil_profiles = {name: {'N': s['N'], 'P': s['P'], 'K': s['K']} for name, s in soils.items()}
+        # Soil types match by exact name only; anything else gets no soil adjustment
+        self.soil_names = list(self.soil_profiles)
+        self.soil_index = {soil: i for i, soil in enumerate(self.soil_names)}
+        self._soil_npk = np.array([[self.soil_profiles[s][k] for k in 'NPK'] for s in self.soil_names]
+                                  + [[0.0, 0.0, 0.0]])
+
+    def _build_products(self, fertilizers):
+        self.fertilizers = [
+            {'name': f['name'], 'npk': tuple(f['npk']), 'type': f.get('type', 'chemical'), 'price': float(f['price'])}
+            for f in fertilizers
+        ]
+        self.organic_fertilizers = [f for f in self.fertilizers if f['type'] == 'organic']
+        self.product_names = tuple(f['name'] for f in self.fertilizers)
+
+        # Product table as arrays for the blend solver
+        self.npk_matrix = np.array([f['npk'] for f in self.fertilizers], dtype=float).reshape(-1, 3)
+        self.prices = np.array([f['price'] for f in self.fertilizers], dtype=float)
+        self.organic_mask = np.array([f['type'] == 'organic' for f in self.fertilizers], dtype=bool)
+
+    def _build_districts(self, district_prices):
+        # District prices: {district key: {product: price}} plus (columns, prices) for the arrays;
+        # the file's own table is kept for rebuilding the columns after a product change
+        self._district_source = district_prices
+        product_ids = {name: i for i, name in enumerate(self.product_names)}
+        self.district_prices = {}
+        self._district_columns = {}
+        for district, overrides in (district_prices or {}).items():
+            overrides = {name: float(p) for name, p in overrides.items() if name in product_ids}
+            key = _fold(district)
+            self.district_prices[key] = overrides
+            self._district_columns[key] = (
+                np.array([product_ids[name] for name in overrides], dtype=int),
+                np.array(list(overrides.values()), dtype=float)
+            )
+
+    @classmethod
+    def from_dir(cls, folder, version=1, previous=None, changed=KB_FILES):
+        """Snapshot of the files in `folder`; with `previous`, only the `changed` files are read."""
+        tables = {}
+        for name in KB_FILES:
+            path = os.path.join(folder, name)
+            if (previous is not None and name not in changed) or (
+                    name in OPTIONAL_FILES and not os.path.exists(path)):
+                tables[name] = None
+                continue
+            with open(path, encoding='utf-8') as f:
+                tables[name] = json.load(f)
+        return cls(tables['crop_nutrients.json'], tables['soil_profiles.json'], tables['fertilizers.json'],
+                   tables['district_prices.json'], version, previous, changed)
+
+    def resolve_crop(self, crop_name):
+        """Database key for a crop name or alias (any case), else a crop named inside it, or None"""
+        if crop_name in self.crop_requirements:
+            return crop_name
+        if not crop_name:
+            return None
+        key = _fold(crop_name)
+        crop = self.crop_index.get(key)
+        if crop is not None:
+            return crop
+        normalized = normalize_question(crop_name)
+        if normalized != key:
+            crop = self.crop_index.get(normalized)
+            if crop is not None:
+                return crop
+        # Only on a miss: a crop named inside the text ("my wheat field"), in database order
+        for name, crop in self._crop_scan:
+            if name in normalized:
+                return crop
+        return None
+
+    def resolve_soil(self, soil_type):
+        """Column of needs_table for a soil type (the last one when unknown)"""
+        return self.soil_index.get(soil_type, len(self.soil_names))
+
+    def price_overrides(self, district):
+        """{product: price} for a district ({} when it has no price list)"""
+        if not district:
+            return {}
+        return self.district_prices.get(_fold(district), {})
+
+    def price_vector(self, district):
+        """Price per kg of every product, in fertilizers order, for a district"""
+        columns = self._district_columns.get(_fold(district)) if district else None
+        if columns is None:
+            return self.prices
+        prices = self.prices.copy()
+        prices[columns[0]] = columns[1]
+        return prices
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "crops": len(self.crop_names),
+            "soils": len(self.soil_names),
+            "products": len(self.fertilizers),
+            "districts": len(self.district_prices)
+        }
+
+
+class KnowledgeBaseStore:
+    """The current KnowledgeBase, swapped for a fresh one when a data file changes.
+
+    current() is a couple of attribute reads; every KB_RELOAD_INTERVAL seconds
+    one caller also stats the files. A change starts a background reload, and
+    callers keep getting the old snapshot until the new one is built and
+    assigned in one step. Only the files whose stamp changed are read and
+    indexed again; the rest is shared with the old snapshot. A file that
+    fails to load (half-written, bad JSON) is reported and the old snapshot
+    stays until the file changes again.
+    """
+
+    def __init__(self, folder=KB_DATA_DIR, interval=KB_RELOAD_INTERVAL):
+        self.folder = folder
+        self.interval = interval
+        self._stamps = self._file_stamps()
+        self.kb = KnowledgeBase.from_dir(folder)
+        # Stamps of the files self.kb was built from
+        self._kb_stamps = self._stamps
+        self._next_check = time.monotonic() + interval
+        self._reloading = threading.Lock()
+        self.reloads = 0
+        self.last_reload_ms = None
+        self.last_error = None
+
+    def _file_stamps(self):
+        stamps = []
+        for name in KB_FILES:
+            try:
+                st = os.stat(os.path.join(self.folder, name))
+                stamps.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def current(self):
+        if time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self.interval
+            stamps = self._file_stamps()
+            if stamps != self._stamps and self._reloading.acquire(blocking=False):
+                threading.Thread(target=self._reload, args=(stamps,), daemon=True).start()
+        return self.kb
+
+    def reload(self):
+        """Load every file now, in this thread; True if the new snapshot is in place."""
+        with self._reloading:
+            return self._load(self._file_stamps(), full=True)
+
+    def _reload(self, stamps):
+        try:
+            self._load(stamps)
+        finally:
+            self._reloading.release()
+
+    def _load(self, stamps, full=False):
+        start = time.perf_counter()
+        # Remembered even on failure, so a broken file is retried only once it changes again
+        self._stamps = stamps
+        previous = None if full else self.kb
+        changed = {name for name, old, new in zip(KB_FILES, self._kb_stamps, stamps) if old != new}
+        try:
+            kb = KnowledgeBase.from_dir(self.folder, self.kb.version + 1, previous, changed)
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Knowledge Base Reload Error: {e}")
+            return False
+        self.kb = kb
+        self._kb_stamps = stamps
+        self.reloads += 1
+        self.last_reload_ms = round((time.perf_counter() - start) * 1000, 2)
+        self.last_error = None
+        print(f"🔄 Knowledge base v{kb.version} loaded in {self.last_reload_ms} ms")
+        return True
+
+    def stats(self):
+        return {
+            **self.kb.stats(),
+            "folder": self.folder,
+            "reloads": self.reloads,
+            "last_reload_ms": self.last_reload_ms,
+            "last_error": self.last_error
+        }
@@ -1,136 +1,281 @@
-import pandas as pd
+import os
 import json
+import pickle
 from datetime import datetime, timedelta
 
+import numpy as np
+
+from blend_solver import budget_blend, batch_budget_blend
+from fertilizer_kb import KnowledgeBaseStore, KB_DATA_DIR
+from response_cache import ResponseCache, make_key
+
+# Memoized plans (per worker): identical requests are common and plans are deterministic
+FERTILIZER_CACHE_MAX_BYTES = int(os.environ.get('FERTILIZER_CACHE_MAX_BYTES', 4 * 1024 * 1024))
+FERTILIZER_CACHE_TTL = int(os.environ.get('FERTILIZER_CACHE_TTL', 6 * 3600))
+
+# (stage, application method, timing) for each part of a split dose
+BASAL = ('Basal (Before Sowing)', 'Basal application', 'At sowing time')
+FIRST_TOP = ('First Top-dressing (21-30 days)', 'Side dressing', '21-30 days after sowing')
+SECOND_TOP = ('Second Top-dressing (45-60 days)', 'Top dressing', '45-60 days after sowing')
+
 class FertilizerRecommender:
-    def __init__(self):
-        # Load crop nutrient requirements database
-        self.crop_requirements = self._load_crop_requirements()
-        # Load fertilizer database
-        self.fertilizers = self._load_fertilizers()
-        # Soil type nutrient profiles
-        self.soil_profiles = self._load_soil_profiles()
+    def __init__(self, data_dir=KB_DATA_DIR):
+        # Crop needs, soil profiles and products from data/, reloaded when the files change
+        self.kb_store = KnowledgeBaseStore(data_dir)
+        # Pickled plans, so every hit unpickles a fresh copy callers may mutate
+        self.plan_cache = ResponseCache(FERTILIZER_CACHE_MAX_BYTES, FERTILIZER_CACHE_TTL)
     
-    def _load_crop_requirements(self):
-        """NPK requirements for different crops (kg/acre)"""
-        return {
-            'Wheat': {'N': 60, 'P': 30, 'K': 20, 'stages': 3},
-            'Rice': {'N': 50, 'P': 25, 'K': 25, 'stages': 3},
-            'Cotton': {'N': 60, 'P': 30, 'K': 30, 'stages': 4},
-            'Soybean': {'N': 25, 'P': 40, 'K': 20, 'stages': 3},
-            'Maize': {'N': 60, 'P': 30, 'K': 25, 'stages': 3},
-            'Sugarcane': {'N': 100, 'P': 50, 'K': 60, 'stages': 4},
-            'Groundnut': {'N': 15, 'P': 35, 'K': 25, 'stages': 3},
-            'Potato': {'N': 70, 'P': 35, 'K': 70, 'stages': 3},
-            'Tomato': {'N': 80, 'P': 40, 'K': 60, 'stages': 4},
-            'Onion': {'N': 50, 'P': 25, 'K': 50, 'stages': 3}
-        }
+    @property
+    def kb(self):
+        """Current knowledge base snapshot; take it once per request"""
+        return self.kb_store.current()
     
-    def _load_fertilizers(self):
-        """Fertilizer products database"""
-        return [
-            {'name': 'Urea', 'npk': (46, 0, 0), 'type': 'chemical', 'price': 6.5},
-            {'name': 'DAP', 'npk': (18, 46, 0), 'type': 'chemical', 'price': 27.0},
-            {'name': 'MOP', 'npk': (0, 0, 60), 'type': 'chemical', 'price': 18.0},
-            {'name': 'NPK 10:26:26', 'npk': (10, 26, 26), 'type': 'chemical', 'price': 22.0},
-            {'name': 'NPK 20:20:0', 'npk': (20, 20, 0), 'type': 'chemical', 'price': 20.0},
-            {'name': 'SSP', 'npk': (0, 16, 0), 'type': 'chemical', 'price': 8.5},
-            {'name': 'Vermicompost', 'npk': (1.5, 1, 1), 'type': 'organic', 'price': 6.0},
-            {'name': 'FYM', 'npk': (0.5, 0.2, 0.5), 'type': 'organic', 'price': 2.5},
-            {'name': 'Neem Cake', 'npk': (5, 1, 2), 'type': 'organic', 'price': 25.0}
-        ]
+    @property
+    def crop_requirements(self):
+        return self.kb.crop_requirements
     
-    def _load_soil_profiles(self):
-        """Typical nutrient levels by soil type"""
-        return {
-            'Black soil': {'N': 0.5, 'P': 0.3, 'K': 0.7},
-            'Red soil': {'N': 0.3, 'P': 0.2, 'K': 0.5},
-            'Alluvial soil': {'N': 0.6, 'P': 0.4, 'K': 0.6},
-            'Laterite soil': {'N': 0.2, 'P': 0.1, 'K': 0.3},
-            'Clay soil': {'N': 0.5, 'P': 0.4, 'K': 0.6}
-        }
+    @property
+    def fertilizers(self):
+        return self.kb.fertilizers
+    
+    @property
+    def soil_profiles(self):
+        return self.kb.soil_profiles
     
     def recommend(self, crop_name, soil_type, land_size, growth_stage, 
-                  soil_test=None, prefer_organic=False, budget=None, season='Kharif'):
+                  soil_test=None, prefer_organic=False, budget=None, season='Kharif',
+                  method='classic', district=None):
         """
         Generate fertilizer recommendation
+        method: 'classic' (DAP, MOP, Urea) or 'solver' (minimum-cost blend)
+        district: use the district's product prices where it has them
+        Plans are memoized on the canonical request (crop and soil resolved,
+        knowledge base version); each call gets its own copy. The land size
+        is used as given, and the plan reports it as 'land_size'.
         """
+        kb = self.kb
+        crop = kb.resolve_crop(crop_name)
+        if crop is None:
+            return self._recommend(kb, crop_name, soil_type, land_size, growth_stage,
+                                   soil_test, prefer_organic, budget, season, method, district)
+        try:
+            land_size = float(land_size)
+        except (TypeError, ValueError):
+            return self._recommend(kb, crop, soil_type, land_size, growth_stage,
+                                   soil_test, prefer_organic, budget, season, method, district)
+        soil = kb.resolve_soil(soil_type)
+        # Districts without their own prices share the default plan
+        prices = kb.price_overrides(district)
+
+        key = self._plan_key(kb.version, crop, soil, land_size, growth_stage, soil_test,
+                             prefer_organic, budget, season, method, sorted(prices.items()))
+        cached = self.plan_cache.get(key)
+        if cached is not None:
+            return pickle.loads(cached)
+        result = self._recommend(kb, crop, soil_type, land_size, growth_stage, soil_test,
+                                 prefer_organic, budget, season, method, district)
+        self.plan_cache.put(key, pickle.dumps(result, pickle.HIGHEST_PROTOCOL))
+        return result
+    
+    def _plan_key(self, version, crop, soil, land_size, growth_stage, soil_test, prefer_organic,
+                  budget, season, method, prices):
+        """Cache key from the request fields in the form that decides the plan"""
+        # Only truthiness and the three parsed levels of a soil test matter
+        if soil_test:
+            try:
+                soil_test = tuple(float(soil_test.get(k, 0)) for k in ('nitrogen', 'phosphorus', 'potassium'))
+            except Exception:
+                soil_test = 'unparsed'
+        else:
+            soil_test = None
+        try:
+            budget = float(budget) if budget and budget > 0 else None
+        except TypeError:
+            budget = repr(budget)
+        return make_key(version, crop, soil, land_size, growth_stage, soil_test, bool(prefer_organic),
+                        budget, season, method, prices)
+    
+    def cache_stats(self):
+        return {**self.plan_cache.stats(), "knowledge_base": self.kb_store.stats()}
+    
+    def _recommend(self, kb, crop_name, soil_type, land_size, growth_stage, 
+                   soil_test, prefer_organic, budget, season, method, district=None):
+        """recommend() without the memo, on one knowledge base snapshot"""
         
         # Get crop requirements
-        if crop_name not in self.crop_requirements:
-            # Try to match case or partial
-            matched = False
-            for c in self.crop_requirements:
-                if c.lower() in crop_name.lower():
-                    crop_name = c
-                    matched = True
-                    break
-            
-            if not matched:
-                return {'error': f'Crop {crop_name} not in database', 'available_crops': list(self.crop_requirements.keys())}
+        resolved = kb.resolve_crop(crop_name)
+        if resolved is None:
+            return {'error': f'Crop {crop_name} not in database', 'available_crops': list(kb.crop_requirements.keys())}
+        crop_name = resolved
         
-        crop_req = self.crop_requirements[crop_name]
+        crop_req = kb.crop_requirements[crop_name]
         
         # Calculate nutrient needs
         nutrient_needs = self._calculate_nutrient_needs(
-            crop_req, 
+            kb,
+            crop_name, 
             soil_type, 
             land_size, 
             soil_test
         )
         
-        # Select fertilizers based on preference
-        if prefer_organic:
-            selected_fertilizers = [f for f in self.fertilizers if f['type'] == 'organic']
+        coverage = None
+        if method == 'solver':
+            # The solver works within the budget itself, trimming nutrients evenly
+            schedule, coverage = self._solve_schedule(kb, nutrient_needs, prefer_organic, budget, land_size, district)
+            total_cost = sum(item['cost'] for item in schedule)
         else:
-            selected_fertilizers = self.fertilizers
+            # Select fertilizers based on preference
+            if prefer_organic:
+                selected_fertilizers = kb.organic_fertilizers
+            else:
+                selected_fertilizers = kb.fertilizers
         
-        # Generate application schedule
-        schedule = self._generate_schedule(
-            nutrient_needs, 
-            selected_fertilizers, 
-            growth_stage, 
-            crop_req.get('stages', 3),
-            land_size
-        )
+            # Generate application schedule
+            schedule = self._generate_schedule(
+                nutrient_needs, 
+                selected_fertilizers, 
+                growth_stage, 
+                crop_req.get('stages', 3),
+                land_size,
+                kb.price_overrides(district)
+            )
         
-        # Calculate total cost
-        total_cost = sum(item['cost'] for item in schedule)
-        
-        # Budget check (if budget is provided and greater than 0)
-        if budget and budget > 0 and total_cost > budget:
-            schedule = self._optimize_for_budget(schedule, budget)
+            # Calculate total cost
             total_cost = sum(item['cost'] for item in schedule)
         
+            # Budget check (if budget is provided and greater than 0)
+            if budget and budget > 0 and total_cost > budget:
+                schedule = self._optimize_for_budget(schedule, budget)
+                total_cost = sum(item['cost'] for item in schedule)
+        
         # Expected yield improvement
         yield_increase = self._calculate_yield_impact(nutrient_needs, soil_test)
         
         # Generate tips
         tips = self._generate_tips(crop_name, soil_type, season, soil_test)
         
-        return {
+        result = {
             'fertilizer_plan': schedule,
             'total_cost': round(total_cost, 2),
             'expected_yield_increase': round(yield_increase, 2),
             'schedule': self._format_schedule(schedule, growth_stage),
             'tips': tips,
-            'nutrient_summary': nutrient_needs
+            'nutrient_summary': nutrient_needs,
+            'land_size': land_size
         }
+        if coverage is not None:
+            result['nutrient_coverage'] = coverage
+        return result
     
-    def _calculate_nutrient_needs(self, crop_req, soil_type, land_size, soil_test):
+    def recommend_batch(self, crop_names, soil_types, land_sizes, soil_test=None,
+                        prefer_organic=False, budget=None, method='classic', district=None):
+        """
+        Fertilizer quantities for many farms at once, in columns
+        crop_names, soil_types, land_sizes: one entry per farm
+        soil_test: optional {'nitrogen': [...], 'phosphorus': [...], 'potassium': [...]}
+        (NaN = not tested); budget: one number or one per farm
+        Each product's quantity is the farm's total; recommend() shows how it
+        is split across stages.
+        Raises ValueError when a column's length doesn't match crop_names.
+        """
+        kb = self.kb
+        farms = len(crop_names)
+        columns = {'soil_types': soil_types, 'land_sizes': land_sizes}
+        for nutrient, levels in (soil_test or {}).items():
+            columns[f'soil_test.{nutrient}'] = levels
+        if budget is not None and np.ndim(budget) > 0:
+            columns['budget'] = budget
+        for column, values in columns.items():
+            if np.ndim(values) != 1 or len(values) != farms:
+                raise ValueError(f"{column} must have one entry per farm ({farms}), "
+                                 f"got {len(values) if np.ndim(values) == 1 else 'a non-list value'}")
+        crop_names = np.asarray(crop_names, dtype=str)
+        soil_types = np.asarray(soil_types, dtype=str)
+        land_sizes = np.asarray(land_sizes, dtype=float)
+
+        # Resolve each distinct name once, then index by farm
+        names, crop_inverse = np.unique(crop_names, return_inverse=True)
+        resolved = [kb.resolve_crop(str(name)) for name in names]
+        crop_index = np.array([kb.crop_ids[c] if c else -1 for c in resolved], dtype=int)[crop_inverse]
+        valid = crop_index >= 0
+
+        soil_names, soil_inverse = np.unique(soil_types, return_inverse=True)
+        soil_index = np.array([kb.resolve_soil(str(s)) for s in soil_names], dtype=int)[soil_inverse]
+
+        needs = kb.needs_table[np.where(valid, crop_index, 0), soil_index] * land_sizes[:, None]
+        if soil_test:
+            levels = np.column_stack([
+                np.nan_to_num(np.asarray(soil_test.get(k, np.zeros(farms)), dtype=float))
+                for k in ('nitrogen', 'phosphorus', 'potassium')
+            ])
+            needs *= 1 - np.minimum(levels / [560.0, 25.0, 280.0], 1.0)
+        needs[~valid] = 0.0
+        needs = np.round(needs, 2)
+
+        if prefer_organic:
+            idx = np.flatnonzero(kb.organic_mask)
+        else:
+            idx = np.arange(len(kb.fertilizers))
+        npk, prices = kb.npk_matrix[idx], kb.price_vector(district)[idx]
+
+        if method == 'solver':
+            quantities, coverage = batch_budget_blend(needs, npk, prices, budget)
+        else:
+            quantities = self._classic_quantities(needs, [kb.fertilizers[i] for i in idx])
+            if budget is not None:
+                cost = quantities @ prices
+                budget = np.broadcast_to(np.asarray(budget, dtype=float), cost.shape)
+                over = (budget > 0) & (cost > budget)
+                quantities[over] *= (budget[over] / cost[over])[:, None]
+            supplied = quantities @ (npk / 100.0)
+            coverage = np.where(needs > 0, np.minimum(supplied / np.where(needs > 0, needs, 1.0), 1.0), 1.0)
+
+        return {
+            'crop': [resolved[i] for i in crop_inverse],
+            'valid': valid,
+            'nitrogen': needs[:, 0],
+            'phosphorus': needs[:, 1],
+            'potassium': needs[:, 2],
+            'products': [kb.fertilizers[i]['name'] for i in idx],
+            'quantity_kg': np.round(quantities, 2),
+            'total_cost': np.round(quantities @ prices, 2),
+            'nutrient_coverage': np.round(coverage, 3)
+        }
+    
+    def _classic_quantities(self, needs, fertilizers):
+        """_generate_schedule's DAP -> MOP -> Urea choice as a (farms, products) quantity matrix"""
+        quantities = np.zeros((len(needs), len(fertilizers)))
+        names = [f['name'] for f in fertilizers]
+
+        def pick(name, nutrient):
+            if name in names:
+                return names.index(name)
+            return next((i for i, f in enumerate(fertilizers) if f['npk'][nutrient] > 10), None)
+
+        n_from_p = 0.0
+        p_source = pick('DAP', 1)
+        if p_source is not None:
+            p_qty = needs[:, 1] / (fertilizers[p_source]['npk'][1] / 100.0)
+            quantities[:, p_source] += p_qty
+            n_from_p = np.round(p_qty * fertilizers[p_source]['npk'][0] / 100.0, 2)
+        k_source = pick('MOP', 2)
+        if k_source is not None:
+            quantities[:, k_source] += needs[:, 2] / (fertilizers[k_source]['npk'][2] / 100.0)
+        n_source = pick('Urea', 0)
+        if n_source is not None:
+            n_needed = np.maximum(needs[:, 0] - n_from_p, 0.0)
+            quantities[:, n_source] += n_needed / (fertilizers[n_source]['npk'][0] / 100.0)
+        return quantities
+    
+    def _calculate_nutrient_needs(self, kb, crop_name, soil_type, land_size, soil_test):
         """Calculate actual nutrient requirements"""
         
-        # Base requirements
-        n_need = crop_req['N'] * land_size
-        p_need = crop_req['P'] * land_size
-        k_need = crop_req['K'] * land_size
-        
-        # Adjust based on soil type
-        if soil_type in self.soil_profiles:
-            profile = self.soil_profiles[soil_type]
-            n_need *= (1 - profile['N'])  # Reduce if soil has N
-            p_need *= (1 - profile['P'])
-            k_need *= (1 - profile['K'])
+        # Base requirements, already adjusted for what the soil type supplies
+        per_acre = kb.needs_rows[kb.crop_ids[crop_name]][kb.resolve_soil(soil_type)]
+        n_need = per_acre[0] * land_size
+        p_need = per_acre[1] * land_size
+        k_need = per_acre[2] * land_size
         
         # Adjust based on soil test (if available)
         if soil_test:
@@ -157,8 +302,10 @@ class FertilizerRecommender:
             'potassium': round(k_need, 2)
         }
     
-    def _generate_schedule(self, nutrient_needs, fertilizers, current_stage, total_stages, land_size):
-        """Generate stage-wise fertilizer application schedule"""
+    def _generate_schedule(self, nutrient_needs, fertilizers, current_stage, total_stages, land_size, prices=None):
+        """Generate stage-wise fertilizer application schedule
+        prices: {product: price} overriding the listed prices (a district's)"""
+        prices = prices or {}
         
         schedule = []
         
@@ -175,6 +322,7 @@ class FertilizerRecommender:
                  dap = next((f for f in fertilizers if f['npk'][1] > 10), None)
             
             if dap:
+                dap_price = prices.get(dap['name'], dap['price'])
                 p_content = dap['npk'][1] / 100.0
                 dap_qty = p_needed / p_content if p_content > 0 else 0
                 
@@ -184,7 +332,7 @@ class FertilizerRecommender:
                     'fertilizer_id': None, # Populated by different key if needed
                     'quantity_kg': round(dap_qty, 2),
                     'quantity_per_acre': round(dap_qty / land_size, 2) if land_size else 0,
-                    'cost': round(dap_qty * dap['price'], 2),
+                    'cost': round(dap_qty * dap_price, 2),
                     'application_method': 'Broadcast' if 'Broadcast' in dap.get('application_method', []) else 'Basal application',
                     'instructions': self._get_application_instructions('Basal application', dap['name']),
                     'timing': 'At sowing time',
@@ -210,6 +358,7 @@ class FertilizerRecommender:
                 mop = next((f for f in fertilizers if f['npk'][2] > 10), None)
                 
             if mop:
+                mop_price = prices.get(mop['name'], mop['price'])
                 k_content = mop['npk'][2] / 100.0
                 mop_qty = k_needed / k_content if k_content > 0 else 0
                 
@@ -222,7 +371,7 @@ class FertilizerRecommender:
                     'fertilizer': mop['name'],
                     'quantity_kg': round(mop_basal, 2),
                     'quantity_per_acre': round(mop_basal / land_size, 2) if land_size else 0,
-                    'cost': round(mop_basal * mop['price'], 2),
+                    'cost': round(mop_basal * mop_price, 2),
                     'application_method': 'Basal application',
                     'instructions': self._get_application_instructions('Basal application', mop['name']),
                     'timing': 'At sowing time',
@@ -234,7 +383,7 @@ class FertilizerRecommender:
                     'fertilizer': mop['name'],
                     'quantity_kg': round(mop_top, 2),
                     'quantity_per_acre': round(mop_top / land_size, 2) if land_size else 0,
-                    'cost': round(mop_top * mop['price'], 2),
+                    'cost': round(mop_top * mop_price, 2),
                     'application_method': 'Top dressing',
                     'instructions': self._get_application_instructions('Top dressing', mop['name']),
                     'timing': '45-60 days after sowing',
@@ -248,6 +397,7 @@ class FertilizerRecommender:
                 urea = next((f for f in fertilizers if f['npk'][0] > 10), None)
                 
             if urea:
+                urea_price = prices.get(urea['name'], urea['price'])
                 n_content = urea['npk'][0] / 100.0
                 urea_qty = n_needed / n_content if n_content > 0 else 0
                 
@@ -260,7 +410,7 @@ class FertilizerRecommender:
                     'fertilizer': urea['name'],
                     'quantity_kg': round(qty_per_split, 2),
                     'quantity_per_acre': round(qty_per_split / land_size, 2) if land_size else 0,
-                    'cost': round(qty_per_split * urea['price'], 2),
+                    'cost': round(qty_per_split * urea_price, 2),
                     'application_method': 'Side dressing',
                     'instructions': self._get_application_instructions('Side dressing', urea['name']),
                     'timing': '21-30 days after sowing',
@@ -272,7 +422,7 @@ class FertilizerRecommender:
                     'fertilizer': urea['name'],
                     'quantity_kg': round(qty_per_split, 2),
                     'quantity_per_acre': round(qty_per_split / land_size, 2) if land_size else 0,
-                    'cost': round(qty_per_split * urea['price'], 2),
+                    'cost': round(qty_per_split * urea_price, 2),
                     'application_method': 'Top dressing',
                     'instructions': self._get_application_instructions('Top dressing', urea['name']),
                     'timing': '45-60 days after sowing',
@@ -281,6 +431,58 @@ class FertilizerRecommender:
         
         return schedule
     
+    def _solve_schedule(self, kb, nutrient_needs, prefer_organic, budget, land_size, district=None):
+        """Minimum-cost blend from the whole product table, split into application stages"""
+        needs = [nutrient_needs['nitrogen'], nutrient_needs['phosphorus'], nutrient_needs['potassium']]
+        if prefer_organic:
+            idx = np.flatnonzero(kb.organic_mask)
+        else:
+            idx = np.arange(len(kb.fertilizers))
+        prices = kb.price_vector(district)
+        quantities, coverage = budget_blend(needs, kb.npk_matrix[idx], prices[idx], budget)
+
+        basal, first_top, second_top = [], [], []
+        for i, qty in zip(idx, quantities.tolist()):
+            if qty <= 0.005:
+                continue
+            fert = kb.fertilizers[i]
+            price = float(prices[i])
+            _, p, k = fert['npk']
+            if p > 0 or fert['type'] == 'organic':
+                # P and organic matter work slowly, so all of it goes in at sowing
+                basal.append(self._schedule_item(BASAL, fert, qty, land_size, price))
+            elif k > 0:
+                # Split K: 1/3 basal, 2/3 later
+                basal.append(self._schedule_item(BASAL, fert, qty / 3, land_size, price))
+                second_top.append(self._schedule_item(SECOND_TOP, fert, qty * 2/3, land_size, price))
+            else:
+                # Split N: 2 top-dressings
+                first_top.append(self._schedule_item(FIRST_TOP, fert, qty / 2, land_size, price))
+                second_top.append(self._schedule_item(SECOND_TOP, fert, qty / 2, land_size, price))
+
+        coverage = dict(zip(('nitrogen', 'phosphorus', 'potassium'), (round(float(c), 3) for c in coverage)))
+        return basal + first_top + second_top, coverage
+    
+    def _schedule_item(self, stage, fert, qty, land_size, price):
+        """One schedule line for `qty` kg of a product at `price` per kg"""
+        stage_name, method, timing = stage
+        n, p, k = fert['npk']
+        return {
+            'stage': stage_name,
+            'fertilizer': fert['name'],
+            'quantity_kg': round(qty, 2),
+            'quantity_per_acre': round(qty / land_size, 2) if land_size else 0,
+            'cost': round(qty * price, 2),
+            'application_method': method,
+            'instructions': self._get_application_instructions(method, fert['name']),
+            'timing': timing,
+            'npk_provided': {
+                'N': round(qty * n / 100, 2),
+                'P': round(qty * p / 100, 2),
+                'K': round(qty * k / 100, 2)
+            }
+        }
+    
     def _optimize_for_budget(self, schedule, budget):
         """Adjust fertilizer plan to fit budget"""
         current_total = sum(item['cost'] for item in schedule)
@@ -0,0 +1,388 @@
+import io
+import os
+import mmap
+import contextlib
+import numpy as np
+from PIL import Image
+
+# Number of sample points along the longer side of the image
+GRID_POINTS = 50
+# Decoded pixels per grid cell along the longer side; keeps samples from
+# being a single noisy pixel while still skipping most of a 12 MP photo
+DECODE_OVERSAMPLE = 4
+# Max number of boxes drawn on the leaf
+MAX_BOXES = 8
+BOX_COLORS = ["#EF4444", "#EAB308", "#F97316"]  # Red, Yellow, Orange
+
+
+def load_leaf_image(image, grid=GRID_POINTS):
+    """Decode an upload at the smallest scale the sampling grid still resolves.
+
+    JPEGs are decoded straight at 1/2, 1/4 or 1/8 scale via draft(), so a
+    4000x3000 photo never exists at full resolution. Other formats are
+    box-reduced before the RGB conversion. `image` is raw bytes or a
+    binary file object (e.g. the spooled upload).
+    """
+    img = Image.open(image if hasattr(image, 'read') else io.BytesIO(image))
+    target = grid * DECODE_OVERSAMPLE
+    long_side = max(img.size)
+
+    if long_side > target:
+        if img.format == 'JPEG':
+            scale = target / long_side
+            img.draft('RGB', (max(1, int(img.width * scale)), max(1, int(img.height * scale))))
+        else:
+            if img.mode not in ('RGB', 'RGBA', 'L'):
+                img = img.convert('RGB')
+            factor = long_side // target
+            if factor > 1:
+                img = img.reduce(factor)
+
+    return np.asarray(img.convert('RGB'))
+
+
+def sample_grid(img_np, grid=GRID_POINTS):
+    """Strided view of the pixels the detector looks at (no copy)."""
+    h, w = img_np.shape[:2]
+    step = max(max(h, w) // grid, 1)
+    return img_np[::step, ::step], step
+
+
+def split_channels(samples):
+    """R, G, B planes as int16 so comparisons like g - 20 cannot wrap around."""
+    rgb = samples.astype(np.int16)
+    return rgb[..., 0], rgb[..., 1], rgb[..., 2]
+
+
+def lesion_mask(r, g, b):
+    """Brownish/yellowish spots that are not bright green leaf."""
+    spots = (r > 80) & (g > 60) & (r > g - 20) & (b < 150)
+    bright_green = (g > r + 30) & (g > b + 30)
+    return spots & ~bright_green
+
+
+def dark_spot_mask(r, g, b):
+    """Fallback for very green leaves: small dark, greyish spots."""
+    return (r < 100) & (g < 100) & (b < 100) & (np.abs(r - g) < 20)
+
+
+def scan_leaf(img_np, grid=GRID_POINTS):
+    """Lesion mask over the sampling grid, the grid step in pixels, and the
+    summed R+G+B of the masked samples (for the mean lesion intensity).
+    """
+    samples, step = sample_grid(img_np, grid)
+    r, g, b = split_channels(samples)
+    mask = lesion_mask(r, g, b)
+    if not mask.any():
+        mask = dark_spot_mask(r, g, b)
+    return mask, step, int((r + g + b)[mask].sum())
+
+
+def find_lesion_mask(img_np, grid=GRID_POINTS):
+    """Boolean lesion mask over the sampling grid, plus the grid step in pixels."""
+    mask, step, _ = scan_leaf(img_np, grid)
+    return mask, step
+
+
+def find_lesion_points(img_np, grid=GRID_POINTS):
+    """Grid points (x, y) in pixel coordinates that look like lesions.
+
+    Points come back in the same row-major order as the old per-pixel loop.
+    """
+    mask, step = find_lesion_mask(img_np, grid)
+    ys, xs = np.nonzero(mask)
+    return list(zip((xs * step).tolist(), (ys * step).tolist()))
+
+
+def _row_runs(mask):
+    """(rows, starts, ends) of every horizontal run of marked cells, row-major, ends exclusive."""
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    return rows.tolist(), starts.tolist(), ends.tolist()
+
+
+def label_clusters(mask):
+    """8-connected regions of a boolean grid, largest first.
+
+    Each cluster is (top, left, bottom, right, size) in grid cells, bounds
+    inclusive. Horizontal runs are found with numpy, then each run is merged
+    (union-find) with the runs it touches in the row above, diagonals
+    included. The cost is linear in the number of runs, which the grid size
+    bounds, so it never depends on the photo size.
+    """
+    rows, starts, ends = _row_runs(mask)
+    parent = list(range(len(rows)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(a, b):
+        a, b = find(a), find(b)
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+
+    n = len(rows)
+    prev_row, prev_lo, prev_hi = -2, 0, 0
+    lo = 0
+    while lo < n:
+        hi = lo
+        while hi < n and rows[hi] == rows[lo]:
+            hi += 1
+        if prev_row == rows[lo] - 1:
+            # Runs [s, e) touch the row above when s_above <= e and s <= e_above
+            j = prev_lo
+            for i in range(lo, hi):
+                while j < prev_hi and ends[j] < starts[i]:
+                    j += 1
+                k = j
+                while k < prev_hi and starts[k] <= ends[i]:
+                    union(i, k)
+                    k += 1
+        prev_row, prev_lo, prev_hi = rows[lo], lo, hi
+        lo = hi
+
+    boxes = {}
+    for i, row in enumerate(rows):
+        root = find(i)
+        length = ends[i] - starts[i]
+        box = boxes.get(root)
+        if box is None:
+            boxes[root] = [row, starts[i], row, ends[i] - 1, length]
+        else:
+            box[1] = min(box[1], starts[i])
+            box[2] = row
+            box[3] = max(box[3], ends[i] - 1)
+            box[4] += length
+
+    clusters = [tuple(box) for box in boxes.values()]
+    clusters.sort(key=lambda c: (-c[4], c[0], c[1]))
+    return clusters
+
+
+def cluster_color(size):
+    """Bigger patches are drawn hotter."""
+    if size >= 6:
+        return BOX_COLORS[0]
+    if size >= 3:
+        return BOX_COLORS[2]
+    return BOX_COLORS[1]
+
+
+def clusters_to_boxes(clusters, step, h, w, max_boxes=MAX_BOXES):
+    """Tight percent boxes around clusters; a grid cell spans `step` pixels."""
+    boxes = []
+    for top, left, bottom, right, size in clusters[:max_boxes]:
+        y0 = int(top * step * 100 / h)
+        x0 = int(left * step * 100 / w)
+        y1 = -(-min((bottom + 1) * step, h) * 100 // h)
+        x1 = -(-min((right + 1) * step, w) * 100 // w)
+        boxes.append({
+            "top": y0,
+            "left": x0,
+            "width": max(1, x1 - x0),
+            "height": max(1, y1 - y0),
+            "color": cluster_color(size)
+        })
+    return boxes
+
+
+def lesion_stats(mask, clusters, rgb_sum):
+    """Numbers the report derives severity, area and urgency from."""
+    lesion_cells = int(mask.sum())
+    return {
+        "lesion_fraction": round(lesion_cells / mask.size, 4) if mask.size else 0.0,
+        "cluster_count": len(clusters),
+        # 0-255 brightness of lesion samples: yellowing is bright, necrosis is dark
+        "mean_intensity": round(rgb_sum / (3 * lesion_cells), 1) if lesion_cells else 0.0
+    }
+
+
+class UnreadableImage(ValueError):
+    """An upload PIL can't decode as an image (corrupt, truncated or not an image)."""
+
+
+class ImageTooLarge(ValueError):
+    """A frame over PIL's decompression-bomb limit, or a tiled-mode frame that
+    would have to be decoded whole and is over TILED_MAX_PIXELS."""
+
+
+# Helper function to detect diseased spots (simulation of CNN detection)
+def detect_lesions(image):
+    """(boxes, stats) for one leaf photo; stats come from the same grid scan.
+
+    An upload that fails to decode raises UnreadableImage (ImageTooLarge for
+    decompression bombs) instead of coming back as a healthy-looking result.
+    """
+    try:
+        img_np = load_leaf_image(image)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(f"{e} Use mode=tiled for very large frames") from e
+    except (OSError, SyntaxError, ValueError) as e:
+        raise UnreadableImage("Could not read the image. Please upload a clear JPEG or PNG photo.") from e
+    h, w, _ = img_np.shape
+
+    mask, step, rgb_sum = scan_leaf(img_np)
+    clusters = label_clusters(mask)
+    return clusters_to_boxes(clusters, step, h, w), lesion_stats(mask, clusters, rgb_sum)
+
+
+# --- Tiled mode for drone / high-resolution field imagery ---
+
+# Tile edge in pixels; one tile (plus PIL's crop of it) is the working set
+TILE_SIZE = 1024
+# Finer than GRID_POINTS: big frames hold many small patches
+TILED_GRID_POINTS = 400
+# JPEGs are draft-decoded down to at most this many pixels before tiling
+TILED_MAX_DECODE_PIXELS = 4 * 1024 * 1024
+# Other compressed formats (PNG, WebP, compressed TIFF) are decoded whole, so
+# larger frames are refused before decoding (3 bytes per pixel once decoded)
+TILED_MAX_PIXELS = int(os.environ.get('TILED_MAX_PIXELS', 32 * 1024 * 1024))
+
+
+# Formats tiled mode reads in bounded memory (draft or memory map), or sizes
+# against TILED_MAX_PIXELS, so PIL's decompression-bomb limit is skipped for them
+UNCHECKED_FORMATS = ('JPEG', 'TIFF', 'BMP', 'PPM')
+
+
+def _open_tiled(source, stack):
+    """Image.open for tiled mode: frames over PIL's MAX_IMAGE_PIXELS open too when
+    they are in UNCHECKED_FORMATS; anything else that big is ImageTooLarge.
+    A file opened here for a path is closed when `stack` unwinds."""
+    if isinstance(source, (str, os.PathLike)):
+        fp = stack.enter_context(open(source, 'rb'))
+    elif hasattr(source, 'read'):
+        fp = source
+    else:
+        fp = io.BytesIO(source)
+    try:
+        return Image.open(fp)
+    except Image.DecompressionBombError as e:
+        Image.init()
+        fp.seek(0)
+        prefix = fp.read(16)
+        for name in UNCHECKED_FORMATS:
+            factory, accept = Image.OPEN[name]
+            if accept is None or accept(prefix) is True:
+                fp.seek(0)
+                return factory(fp)
+        raise ImageTooLarge(f"{e} Send a JPEG or an uncompressed TIFF/BMP")
+    except (OSError, SyntaxError) as e:
+        raise UnreadableImage("Could not read the image. Please upload a clear JPEG or PNG photo.") from e
+
+
+def _raw_pixel_view(img, source):
+    """Zero-copy (h, w, 3) view of uncompressed RGB/BGR pixel data, or None.
+
+    Works for PPM, 24-bit BMP and uncompressed contiguous TIFF. Paths and
+    real files are memory-mapped, bytes are wrapped in place, so only the
+    pages a tile touches are ever read.
+    """
+    tiles = img.tile
+    if not tiles or img.mode != 'RGB' or any(t[0] != 'raw' for t in tiles):
+        return None
+    args = tiles[0][3]
+    rawmode, stride, orientation = (args, 0, 1) if isinstance(args, str) else tuple(args)[:3]
+    if rawmode not in ('RGB', 'BGR') or any(t[3] != tiles[0][3] for t in tiles):
+        return None
+
+    w, h = img.size
+    stride = stride or w * 3
+    offset = tiles[0][2]
+    # Multi-strip TIFFs are fine as long as the strips are back to back
+    for t in tiles:
+        x0, y0, x1, _ = t[1]
+        if x0 != 0 or x1 != w or t[2] != offset + y0 * stride:
+            return None
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        buf = source
+    else:
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            try:
+                buf = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+            except (AttributeError, OSError, io.UnsupportedOperation, ValueError):
+                return None
+
+    if len(buf) < offset + h * stride:
+        return None
+    pixels = np.ndarray((h, w, 3), dtype=np.uint8, buffer=buf, offset=offset, strides=(stride, 3, 1))
+    if orientation < 0:
+        pixels = pixels[::-1]
+    if rawmode == 'BGR':
+        pixels = pixels[..., ::-1]
+    return pixels
+
+
+def detect_lesions_tiled(source, tile=TILE_SIZE, grid=TILED_GRID_POINTS, max_boxes=MAX_BOXES):
+    """(boxes, stats) for very large frames, scanned tile by tile.
+
+    `source` is a path, bytes or a binary file. Uncompressed RGB is read
+    through a memory map and JPEGs are draft-decoded to at most
+    TILED_MAX_DECODE_PIXELS, so both run in constant memory at any size.
+    Other formats are decoded whole by PIL and cropped; above
+    TILED_MAX_PIXELS they raise ImageTooLarge before decoding. The sampling
+    grid is aligned to the whole frame, so each tile's samples land in one
+    small global mask. Lesions that cross a tile edge merge into one cluster
+    and come back as global boxes. A frame that fails to decode raises,
+    rather than coming back as an empty (healthy-looking) result.
+    """
+    with contextlib.ExitStack() as stack:
+        img = _open_tiled(source, stack)
+
+        pixels = _raw_pixel_view(img, source)
+        if pixels is None and img.format == 'JPEG':
+            # libjpeg only scales by 1/2, 1/4 or 1/8; pick the first that fits
+            factor = 1
+            while factor < 8 and img.width * img.height > TILED_MAX_DECODE_PIXELS * factor * factor:
+                factor *= 2
+            if factor > 1:
+                img.draft('RGB', (-(-img.width // factor), -(-img.height // factor)))
+        elif pixels is None and img.width * img.height > TILED_MAX_PIXELS:
+            raise ImageTooLarge(
+                f"{img.format or 'Image'} frames over {TILED_MAX_PIXELS} pixels are not supported in tiled mode "
+                f"({img.width}x{img.height}); send a JPEG or an uncompressed TIFF/BMP"
+            )
+        if pixels is None and img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        w, h = img.size
+        step = max(max(h, w) // grid, 1)
+        # Tiles start on grid points so every sample belongs to exactly one tile
+        tile = max(step, tile // step * step)
+        rows, cols = -(-h // step), -(-w // step)
+        lesions = np.zeros((rows, cols), dtype=bool)
+        dark_spots = np.zeros((rows, cols), dtype=bool)
+        lesion_rgb = dark_rgb = 0
+
+        for y0 in range(0, h, tile):
+            for x0 in range(0, w, tile):
+                y1, x1 = min(y0 + tile, h), min(x0 + tile, w)
+                if pixels is not None:
+                    block = pixels[y0:y1:step, x0:x1:step]
+                else:
+                    block = np.asarray(img.crop((x0, y0, x1, y1)))[::step, ::step]
+                r, g, b = split_channels(block)
+                gy, gx = y0 // step, x0 // step
+                rgb = r + g + b
+                tile_lesions = lesion_mask(r, g, b)
+                tile_dark = dark_spot_mask(r, g, b)
+                lesions[gy:gy + block.shape[0], gx:gx + block.shape[1]] = tile_lesions
+                dark_spots[gy:gy + block.shape[0], gx:gx + block.shape[1]] = tile_dark
+                lesion_rgb += int(rgb[tile_lesions].sum())
+                dark_rgb += int(rgb[tile_dark].sum())
+
+    if lesions.any():
+        mask, rgb_sum = lesions, lesion_rgb
+    else:
+        mask, rgb_sum = dark_spots, dark_rgb
+    clusters = label_clusters(mask)
+    return clusters_to_boxes(clusters, step, h, w, max_boxes), lesion_stats(mask, clusters, rgb_sum)
@@ -0,0 +1,83 @@
+import os
+import time
+import threading
+
+# Seconds to wait after startup before importing SDKs in the background,
+# so the worker is answering /health before the heavy imports start
+PROVIDER_WARMUP_DELAY = float(os.environ.get('PROVIDER_WARMUP_DELAY', 1.0))
+
+
+class LazyProvider:
+    """An SDK client that is imported and built on first use, not at import time.
+
+    `factory(api_key)` does the SDK import and returns the client. It runs
+    at most once; if it fails the provider is marked unavailable, the same
+    way a failed eager init used to be.
+    """
+
+    def __init__(self, name, api_key, factory):
+        self.name = name
+        self.api_key = api_key
+        self.factory = factory
+        self._client = None
+        self._failed = False
+        self._lock = threading.Lock()
+
+    def available(self):
+        """Has a key and hasn't failed to load. Never imports anything."""
+        return bool(self.api_key) and not self._failed
+
+    def loaded(self):
+        return self._client is not None
+
+    def client(self):
+        """The SDK client, importing and configuring it on the first call. None if unavailable."""
+        if self._client is not None or not self.available():
+            return self._client
+        with self._lock:
+            if self._client is None and not self._failed:
+                try:
+                    self._client = self.factory(self.api_key)
+                    print(f"✅ {self.name} initialized")
+                except Exception as e:
+                    print(f"⚠️ {self.name} Init Error: {e}")
+                    self._failed = True
+        return self._client
+
+
+class ProviderRegistry:
+    """Named LazyProviders, plus a background warm-up that loads them all."""
+
+    def __init__(self):
+        self._providers = {}
+        self._warm_thread = None
+
+    def register(self, name, api_key, factory):
+        self._providers[name] = LazyProvider(name, api_key, factory)
+        return self._providers[name]
+
+    def __getitem__(self, name):
+        return self._providers[name]
+
+    def warm_up(self, then=None, delay=PROVIDER_WARMUP_DELAY):
+        """Load every configured SDK on a daemon thread after `delay` seconds, then call `then()`."""
+        if self._warm_thread is not None:
+            return self._warm_thread
+
+        def warm():
+            time.sleep(delay)
+            for provider in self._providers.values():
+                if provider.available():
+                    provider.client()
+            if then is not None:
+                then()
+
+        self._warm_thread = threading.Thread(target=warm, name="provider-warmup", daemon=True)
+        self._warm_thread.start()
+        return self._warm_thread
+
+    def status(self):
+        return {
+            name: {"configured": bool(p.api_key), "available": p.available(), "loaded": p.loaded()}
+            for name, p in self._providers.items()
+        }
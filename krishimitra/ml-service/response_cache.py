@@ -0,0 +1,203 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def content_hasher():
+    """Incremental content hasher for uploads, fed while they stream in."""
+    return hashlib.blake2b(digest_size=16)
+
+
+def make_key(*parts):
+    """Cache key from a content hash plus the request fields that change the answer."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(str(part).encode('utf-8'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+# Seconds a disk entry's last-access time may lag before a read rewrites it,
+# so repeated hits don't each cost a write transaction
+ACCESSED_SLACK = 60
+
+
+class DiskStore:
+    """SQLite-backed key -> bytes store shared by every worker on the box."""
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB, size INTEGER, expires REAL, accessed REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        return self._conn
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return None if entry is None else entry[0]
+
+    def get_entry(self, key):
+        """(value, expires) of a live entry, or None.
+
+        Reads stay read-only: expired rows are left for _evict, and the LRU
+        `accessed` time is only rewritten once it is ACCESSED_SLACK old.
+        """
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT value, expires, accessed FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] < now:
+                return None
+            if now - row[2] > ACCESSED_SLACK:
+                db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+                db.commit()
+            return bytes(row[0]), row[1]
+
+    def contains(self, key):
+        """True if a live entry exists, without reading its value."""
+        with self._lock:
+            row = self._db().execute(
+                "SELECT 1 FROM entries WHERE key = ? AND expires >= ? LIMIT 1", (key, time.time())
+            ).fetchone()
+        return row is not None
+
+    def put(self, key, value, expires):
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(value), len(value), expires, time.time())
+            )
+            self._evict(db)
+            db.commit()
+
+    def _evict(self, db):
+        db.execute("DELETE FROM entries WHERE expires < ?", (time.time(),))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used rows until we are back under budget
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            count, total = self._db().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {"path": self.path, "entries": count, "bytes": total, "max_bytes": self.max_bytes}
+
+
+class ResponseCache:
+    """LRU + TTL cache of serialized responses, bounded by total bytes.
+
+    With `disk_path` set, entries are also written to a DiskStore so they
+    survive a worker restart; memory misses fall back to disk.
+    """
+
+    def __init__(self, max_bytes, ttl, disk_path=None, disk_max_bytes=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.disk = DiskStore(disk_path, disk_max_bytes or max_bytes * 4) if disk_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self._drop(key)
+
+        if self.disk is not None:
+            try:
+                entry = self.disk.get_entry(key)
+            except sqlite3.Error as e:
+                print(f"Cache Disk Error: {e}")
+                entry = None
+            if entry is not None:
+                value, expires = entry
+                with self._lock:
+                    self.disk_hits += 1
+                    # Keep the disk expiry: promotion must not extend the entry's life
+                    self._store(key, value, min(expires, now + self.ttl))
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, expires)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, value, expires)
+            except sqlite3.Error as e:
+                print(f"Cache Disk Error: {e}")
+
+    def _store(self, key, value, expires):
+        if len(value) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (expires, value)
+        self._bytes += len(value)
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            data = {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0
+            }
+        if self.disk is not None:
+            try:
+                data["disk"] = self.disk.stats()
+            except sqlite3.Error as e:
+                data["disk"] = {"error": str(e)}
+        return data
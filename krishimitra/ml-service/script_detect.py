@@ -0,0 +1,209 @@
+import re
+import math
+from bisect import bisect_right
+from collections import Counter
+from functools import lru_cache
+
+# (first codepoint, last codepoint, script), sorted by first codepoint
+SCRIPT_RANGES = (
+    (0x0041, 0x005A, 'Latin'),
+    (0x0061, 0x007A, 'Latin'),
+    (0x00C0, 0x024F, 'Latin'),
+    (0x0900, 0x097F, 'Devanagari'),
+    (0x0980, 0x09FF, 'Bengali'),
+    (0x0A00, 0x0A7F, 'Gurmukhi'),
+    (0x0A80, 0x0AFF, 'Gujarati'),
+    (0x0B80, 0x0BFF, 'Tamil'),
+    (0x0C00, 0x0C7F, 'Telugu'),
+    (0x0C80, 0x0CFF, 'Kannada'),
+    (0x0D00, 0x0D7F, 'Malayalam'),
+    (0xA8E0, 0xA8FF, 'Devanagari'),
+)
+_STARTS = [start for start, _, _ in SCRIPT_RANGES]
+
+SCRIPT_LANGUAGES = {
+    'Latin': 'en',
+    'Devanagari': 'hi',  # or 'mr', settled by the n-gram model below
+    'Bengali': 'bn',
+    'Gurmukhi': 'pa',
+    'Gujarati': 'gu',
+    'Tamil': 'ta',
+    'Telugu': 'te',
+    'Kannada': 'kn',
+    'Malayalam': 'ml',
+}
+
+# An Indian script wins over Latin once it is this share of the letters, so
+# code-mixed messages ("मेरी wheat crop में problem है") keep their Indian language
+INDIC_MIN_SHARE = 0.2
+# Characters of a message looked at: the language is settled long before this
+SCRIPT_SAMPLE_CHARS = 300
+# Characters of Devanagari text scored by the Hindi/Marathi model
+NGRAM_SAMPLE_CHARS = 300
+# Marathi must beat Hindi by this many nats per character (Hindi is the safer default)
+MARATHI_MARGIN = 0.05
+
+@lru_cache(maxsize=4096)
+def script_of(ch):
+    """Script name of one character, or None (digits, punctuation, spaces, other scripts)."""
+    cp = ord(ch)
+    i = bisect_right(_STARTS, cp) - 1
+    return SCRIPT_RANGES[i][2] if i >= 0 and cp <= SCRIPT_RANGES[i][1] else None
+
+
+def _char_class(scripts):
+    return re.compile('[' + ''.join(
+        f'\\u{start:04X}-\\u{end:04X}' for start, end, script in SCRIPT_RANGES if script in scripts
+    ) + ']')
+
+
+_ALL_SCRIPTS = set(SCRIPT_LANGUAGES)
+# Any letter we know the script of, and any letter outside one given script
+_ANY_LETTER = _char_class(_ALL_SCRIPTS)
+_OTHER_LETTER = {script: _char_class(_ALL_SCRIPTS - {script}) for script in _ALL_SCRIPTS}
+_ASCII_LETTER = re.compile('[A-Za-z]')
+
+
+def script_counts(text):
+    """{script: letters} in one pass. Counter tallies codepoints in C, so only
+    distinct characters go through the range lookup."""
+    counts = {}
+    for ch, n in Counter(text).items():
+        script = script_of(ch)
+        if script is not None:
+            counts[script] = counts.get(script, 0) + n
+    return counts
+
+
+# Small farming-domain samples the Hindi/Marathi character n-gram model is built from
+_DEVANAGARI_SAMPLES = {
+    'hi': (
+        "गेहूं की बुवाई नवंबर में करें। धान की रोपाई के बाद खेत में पानी भरा रखें। "
+        "मेरी फसल में कीड़े लग गए हैं, क्या करूं? टमाटर के पत्तों पर धब्बे हैं। "
+        "यूरिया और डीएपी कितनी मात्रा में डालना चाहिए? बारिश के बाद कपास में सुंडी का खतरा बढ़ जाता है। "
+        "मिट्टी की जांच करवाना जरूरी है। किसान भाई जैविक खाद का प्रयोग करें। "
+        "आलू की फसल को झुलसा रोग से कैसे बचाएं? प्याज का भाव आज मंडी में क्या है? "
+        "सिंचाई हर बीस दिन में करनी चाहिए। मुझे नहीं पता कि कौन सी दवा छिड़कनी है। "
+        "यह बीज अच्छा है और इसकी पैदावार ज्यादा होती है। गन्ने में खाद कब डालें? "
+        "मौसम खराब है इसलिए छिड़काव कल करें। हमारे गांव में बहुत गर्मी पड़ रही है। "
+        "नमस्ते भाई, मुझे खेती के बारे में जानकारी चाहिए।"
+    ),
+    'mr': (
+        "गव्हाची पेरणी नोव्हेंबर महिन्यात करा. भाताची लागवड केल्यानंतर शेतात पाणी साचून ठेवा. "
+        "माझ्या पिकावर कीड पडली आहे, काय करू? टोमॅटोच्या पानांवर डाग आहेत. "
+        "युरिया आणि डीएपी किती प्रमाणात द्यायचे? पावसानंतर कापसावर बोंडअळीचा धोका वाढतो. "
+        "मातीची तपासणी करणे आवश्यक आहे. शेतकरी बांधवांनी सेंद्रिय खताचा वापर करावा. "
+        "बटाट्याच्या पिकाला करपा रोगापासून कसे वाचवायचे? आज बाजारात कांद्याचा भाव काय आहे? "
+        "दर वीस दिवसांनी पाणी द्यावे. मला माहित नाही कोणते औषध फवारायचे. "
+        "हे बियाणे चांगले आहे आणि याचे उत्पादन जास्त येते. उसाला खत कधी घालायचे? "
+        "हवामान खराब आहे म्हणून फवारणी उद्या करा. आमच्या गावात खूप उष्णता आहे. "
+        "नमस्कार भाऊ, मला शेतीविषयी माहिती हवी आहे."
+    ),
+}
+
+
+class CharNgramModel:
+    """Add-one smoothed character trigram model, trained on a small sample text."""
+
+    def __init__(self, text, n=3):
+        self.n = n
+        self.counts = Counter()
+        self.context = Counter()
+        padded = f" {text} "
+        for i in range(len(padded) - n + 1):
+            gram = padded[i:i + n]
+            self.counts[gram] += 1
+            self.context[gram[:-1]] += 1
+        self.vocab = len(set(padded)) + 1
+
+    def log_prob(self, gram):
+        return math.log(self.counts[gram] + 1) - self.context_norm(gram[:-1])
+
+    def context_norm(self, context):
+        return math.log(self.context[context] + self.vocab)
+
+
+def _ratio_tables(mr, hi):
+    """log P_mr - log P_hi per trigram, so scoring is one dict lookup per character.
+
+    Trigrams neither sample contains only differ by their context's
+    normalizer, which gets its own table (and a constant for unseen contexts).
+    """
+    grams = {gram: mr.log_prob(gram) - hi.log_prob(gram) for gram in set(mr.counts) | set(hi.counts)}
+    contexts = {
+        context: hi.context_norm(context) - mr.context_norm(context)
+        for context in set(mr.context) | set(hi.context)
+    }
+    return grams, contexts, math.log(hi.vocab) - math.log(mr.vocab)
+
+
+_MR_GRAMS, _MR_CONTEXTS, _MR_DEFAULT = _ratio_tables(
+    CharNgramModel(_DEVANAGARI_SAMPLES['mr']), CharNgramModel(_DEVANAGARI_SAMPLES['hi'])
+)
+
+
+@lru_cache(maxsize=8192)
+def _word_ratio(word):
+    """Summed Marathi/Hindi log-likelihood ratio of one space-padded word's trigrams.
+
+    Farming questions reuse a small vocabulary, so words are scored once.
+    """
+    padded = f" {word} "
+    total = 0.0
+    grams, contexts = _MR_GRAMS, _MR_CONTEXTS
+    for i in range(len(padded) - 2):
+        gram = padded[i:i + 3]
+        ratio = grams.get(gram)
+        if ratio is None:
+            ratio = contexts.get(gram[:2], _MR_DEFAULT)
+        total += ratio
+    return total
+
+
+def devanagari_language(text):
+    """('hi' or 'mr', probability) for Devanagari text, from the character n-gram models."""
+    words = text[:NGRAM_SAMPLE_CHARS].split()
+    if not words:
+        return 'hi', 0.5
+    # Each padded word contributes one trigram per character plus one
+    steps = sum(map(len, words)) + len(words)
+    # Per-character log-likelihood ratio, squashed into a probability
+    score = sum(map(_word_ratio, words)) / steps - MARATHI_MARGIN
+    p_mr = 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, score * 20))))
+    return ('mr', p_mr) if p_mr > 0.5 else ('hi', 1.0 - p_mr)
+
+
+def classify(text):
+    """(language code, script, confidence 0-1) of a message, from its first
+    SCRIPT_SAMPLE_CHARS characters.
+
+    The confidence is the dominant script's share of the letters, times the
+    Hindi/Marathi model's probability for Devanagari. Text with no letters
+    is English with confidence 0. Pure ASCII and single-script messages are
+    settled by a couple of regex scans; only mixed scripts are counted.
+    """
+    if not text or text.isascii():
+        return ('en', 'Latin', 1.0) if text and _ASCII_LETTER.search(text) else ('en', None, 0.0)
+
+    sample = text[:SCRIPT_SAMPLE_CHARS]
+    first = _ANY_LETTER.search(sample)
+    if first is None:
+        return 'en', None, 0.0
+    script = script_of(first.group())
+    if _OTHER_LETTER[script].search(sample, first.end()) is None:
+        confidence = 1.0
+    else:
+        counts = script_counts(sample)
+        letters = sum(counts.values())
+        indic = {name: n for name, n in counts.items() if name != 'Latin'}
+        if indic and sum(indic.values()) >= INDIC_MIN_SHARE * letters:
+            script = max(indic, key=indic.get)
+        else:
+            script = 'Latin'
+        confidence = counts[script] / letters
+
+    language = SCRIPT_LANGUAGES[script]
+    if script == 'Devanagari':
+        language, p = devanagari_language(text)
+        confidence *= p
+    return language, script, round(confidence, 3)
@@ -0,0 +1,108 @@
+"""
+KrishiMitra Semantic Chat Cache Test
+Labelled question pairs that must (paraphrases) or must not (near misses)
+share a cached answer. SEMANTIC_CACHE_THRESHOLD is set from these: above
+every near miss's similarity, with as many paraphrases as possible over it
+Usage: python -m pytest test_semantic_cache.py, or python test_semantic_cache.py
+       to print the similarity of every pair
+"""
+
+from chat_cache import SemanticCache, SEMANTIC_CACHE_THRESHOLD, question_quantities
+
+# (cached question, new question)
+PARAPHRASES = [
+    ("wheat sowing time", "when do I sow wheat"),
+    ("how much urea for 1 acre wheat", "urea quantity for 1 acre of wheat"),
+    ("best fertilizer for rice", "which fertilizer is best for rice"),
+    ("how to control aphids in mustard", "how do I control aphids on mustard"),
+    ("tomato leaf curl treatment", "how to treat leaf curl in tomato"),
+    ("what is the price of onion today", "onion price today"),
+    ("how to control pink bollworm in cotton", "cotton pink bollworm control"),
+    ("गेहूं की बुवाई कब करें", "गेहूं की बुवाई का समय"),
+    ("when should I irrigate wheat", "wheat irrigation time"),
+    ("मक्का में कौन सा खाद डालें", "मक्का के लिए सबसे अच्छा खाद"),
+]
+
+NEAR_MISSES = [
+    ("how much urea for 1 acre wheat", "how much urea for 5 acre wheat"),
+    ("how much urea for 1 acre wheat", "how much urea for 10 acre wheat"),
+    ("how much urea for 1 acre wheat", "how much DAP for 1 acre wheat"),
+    ("how much urea per acre", "how much urea per hectare"),
+    ("spray 2 ml per litre", "spray 20 ml per litre"),
+    ("wheat sowing time", "wheat harvesting time"),
+    ("wheat sowing time", "rice sowing time"),
+    ("best fertilizer for rice", "best fertilizer for wheat"),
+    ("how to control aphids in mustard", "how to control aphids in cotton"),
+    ("tomato leaf curl treatment", "potato leaf curl treatment"),
+    ("what is the price of onion today", "what is the price of tomato today"),
+    ("गेहूं की बुवाई कब करें", "चावल की बुवाई कब करें"),
+    ("when should I irrigate wheat", "when should I harvest wheat"),
+    ("how to control pink bollworm in cotton", "how to control whitefly in cotton"),
+    ("मक्का में कौन सा खाद डालें", "गेहूं में कौन सा खाद डालें"),
+    ("2 एकड़ में कितना यूरिया", "५ एकड़ में कितना यूरिया"),
+]
+
+# Share of PARAPHRASES that must hit at the configured threshold
+MIN_PARAPHRASE_HITS = 0.6
+
+
+def make_cache(threshold=SEMANTIC_CACHE_THRESHOLD):
+    """A cache holding every cached question of both lists, answered by itself."""
+    cache = SemanticCache(threshold=threshold)
+    for cached, _ in PARAPHRASES + NEAR_MISSES:
+        cache.put('en', cached, cached, 100.0)
+    return cache
+
+
+def similarity(cache, cached, question):
+    answer, sim = cache.nearest('en', question)
+    return sim if answer == cached else 0.0
+
+
+def test_near_misses_never_hit():
+    cache = make_cache()
+    for cached, question in NEAR_MISSES:
+        assert cache.get('en', question) is None, (cached, question)
+
+
+def test_paraphrases_hit():
+    cache = make_cache()
+    hits = [cached for cached, question in PARAPHRASES if cache.get('en', question) == cached]
+    assert len(hits) >= MIN_PARAPHRASE_HITS * len(PARAPHRASES)
+    assert "wheat sowing time" in hits
+
+
+def test_threshold_margin():
+    """The threshold sits clear of the closest near miss the quantity check lets through."""
+    cache = make_cache()
+    closest = max(similarity(cache, cached, question) for cached, question in NEAR_MISSES
+                  if question_quantities(cached) == question_quantities(question))
+    assert closest + 0.05 <= SEMANTIC_CACHE_THRESHOLD
+
+
+def test_quantities_must_match():
+    assert question_quantities("urea for 5 acre") != question_quantities("urea for 1 acre")
+    assert question_quantities("urea per acre") != question_quantities("urea per hectare")
+    assert question_quantities("५ एकड़") == question_quantities("5 acres")
+    assert question_quantities("five acres") == question_quantities("5 acre")
+    assert question_quantities("2.5 kg") != question_quantities("2 5 kg")
+
+    cache = SemanticCache(threshold=0.0)
+    cache.put('en', "how much urea for 1 acre wheat", "1 acre answer", 100.0)
+    assert cache.get('en', "how much urea for 5 acre wheat") is None
+    assert cache.get('en', "how much urea for 1 acre of wheat") == "1 acre answer"
+
+
+def main():
+    cache = make_cache()
+    for label, pairs in (("Paraphrases", PARAPHRASES), ("Near misses", NEAR_MISSES)):
+        print(f"\n{label}")
+        for cached, question in pairs:
+            sim = similarity(cache, cached, question)
+            hit = cache.get('en', question) == cached
+            print(f"   {sim:5.2f} {'HIT ' if hit else '    '} {cached} / {question}")
+    print(f"\nThreshold: {SEMANTIC_CACHE_THRESHOLD}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import unicodedata
+
+# ASCII punctuation (Unicode category P) -> space, for the all-ASCII fast path
+_ASCII_PUNCTUATION = {
+    cp: ' ' for cp in range(128) if unicodedata.category(chr(cp)).startswith('P')
+}
+
+
+def normalize_question(text):
+    """Canonical form of a question: NFC, case-folded, punctuation dropped, whitespace collapsed.
+
+    Combining marks (Devanagari matras etc.) are kept, so only spelling
+    differences that don't change the words are folded together. ASCII text
+    skips the per-character category lookups; the result is the same.
+    """
+    if text.isascii():
+        return ' '.join(text.lower().translate(_ASCII_PUNCTUATION).split())
+    text = unicodedata.normalize('NFC', text).casefold()
+    text = ''.join(' ' if unicodedata.category(ch).startswith('P') else ch for ch in text)
+    return ' '.join(text.split())
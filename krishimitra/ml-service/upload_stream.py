@@ -0,0 +1,95 @@
+import io
+import os
+import tempfile
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from response_cache import content_hasher
+
+# Bytes read per step while hashing; the only buffer we allocate per upload
+CHUNK_SIZE = 64 * 1024
+MAX_IMAGE_BYTES = int(os.environ.get('MAX_IMAGE_UPLOAD_BYTES', 15 * 1024 * 1024))
+MAX_AUDIO_BYTES = int(os.environ.get('MAX_AUDIO_UPLOAD_BYTES', 10 * 1024 * 1024))
+
+
+class UploadTooLarge(RequestEntityTooLarge):
+    """A single file part is over its cap (the whole request cap is Werkzeug's own 413)."""
+
+    def __init__(self, limit):
+        super().__init__(f"File too large. Maximum size is {limit // (1024 * 1024)} MB.")
+        self.limit = limit
+
+
+class Upload:
+    """A size-checked, hashed upload that still lives in Werkzeug's spooled file."""
+
+    def __init__(self, stream, size, digest, filename):
+        self.stream = stream
+        self.size = size
+        self.digest = digest
+        self.filename = filename
+
+    def open(self):
+        """The underlying file object, rewound; hand this to PIL or the STT client."""
+        self.stream.seek(0)
+        return self.stream
+
+    def read(self):
+        """Whole upload as bytes, for work that must cross a process boundary."""
+        return self.open().read()
+
+
+def _spool(stream, max_bytes):
+    """Copy a non-seekable stream to a temp file, enforcing the size cap as we go."""
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    total = 0
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+        total += len(chunk)
+        if total > max_bytes:
+            spooled.close()
+            raise UploadTooLarge(max_bytes)
+        spooled.write(chunk)
+    spooled.seek(0)
+    return spooled
+
+
+def ingest_upload(file_storage, max_bytes):
+    """Check size and hash a multipart file part without copying it into `bytes`.
+
+    The size is read from the spooled file before any data is touched, so an
+    oversized upload is rejected without hashing it. Hashing reuses one
+    CHUNK_SIZE buffer through memoryview slices.
+    """
+    stream = file_storage.stream
+    # Probe by seeking: SpooledTemporaryFile has no seekable() before Python 3.11,
+    # and its seek() returns None there, hence tell()
+    try:
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+        stream.seek(0)
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        stream = _spool(stream, max_bytes)
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+        stream.seek(0)
+
+    if size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+
+    hasher = content_hasher()
+    buf = bytearray(CHUNK_SIZE)
+    view = memoryview(buf)
+    readinto = getattr(stream, 'readinto', None)
+    while True:
+        if readinto is not None:
+            n = readinto(view)
+            if not n:
+                break
+            hasher.update(view[:n])
+        else:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    stream.seek(0)
+
+    return Upload(stream, size, hasher.hexdigest(), file_storage.filename)
@@ -1,5 +1,4 @@
 import os
-import io
 import google.generativeai as genai
 from openai import OpenAI
 from anthropic import Anthropic
@@ -236,8 +235,9 @@ Remember: YOU ARE RESPONDING TO A FARMER. Be helpful, clear, and practical!"""
             return None
             
         try:
-            audio_file = io.BytesIO(audio_bytes)
-            audio_file.name = "recording.webm" 
+            # bytes or a file object; a (name, content) tuple lets the SDK stream
+            # a spooled upload without copying it into memory first
+            audio_file = ("recording.webm", audio_bytes)
             
             # Whisper auto-detects language, but we can hint it
             transcript = openai_client.audio.transcriptions.create(